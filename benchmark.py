@@ -0,0 +1,601 @@
+# Benchmarks for the inventory app's hot paths, run without opening a window.
+#
+#   python benchmark.py                                   # quick run, small data
+#   python benchmark.py --items 1000 --items 1000000 --bill-rows 10000000 --out before.json
+#
+# Every size gets its own database built by a deterministic generator (same
+# seed, same data), and the timings are written as JSON so runs from before
+# and after a change can be compared.
+import argparse
+import csv
+import functools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import main
+
+WORDS = ["chips", "soap", "rice", "dal", "milk", "bread", "tea", "coffee", "sugar", "salt", "oil", "paneer",
+         "ghee", "atta", "biscuit", "jam", "noodles", "shampoo", "pen", "battery"]
+CUSTOMERS = ["Asha", "Ravi", "Meena", "Imran", "Kiran", "Joseph", "Fatima", "Arjun", "Lakshmi", "Walk-in"]
+BILL_START = datetime(2024, 1, 1, 9, 0, 0)
+
+
+def item_name(rng, number):
+    return f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {number}"
+
+
+def generate_inventory(conn, count, seed=1, chunk=50000):
+    # count distinct (name, price) rows with plenty of stock
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    for start in range(0, count, chunk):
+        cur.executemany("INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)",
+                        [(item_name(rng, number), rng.randint(100, 10000), float(rng.randint(5, 2000)))
+                         for number in range(start, min(start + chunk, count))])
+    add_lots(cur)
+    conn.commit()
+
+
+def add_lots(cur):
+    # One stock lot per inventory row, bought in at 80% of the price
+    cur.execute("""INSERT INTO stock_lots (inventory_id, received_at, unit_cost, quantity, qty_remaining)
+                   SELECT id, '2024-01-01 00:00:00', price * 0.8, quantity, quantity FROM inventory ORDER BY id""")
+
+
+def generate_bill_lines(count, item_count, seed=2):
+    # Yields (date, customer, item name, qty, price) bill lines, 1-8 lines per bill,
+    # a few minutes apart, so a large history spans years
+    rng = random.Random(seed)
+    when = BILL_START
+    produced = 0
+    while produced < count:
+        when += timedelta(seconds=rng.randint(30, 600))
+        bill_date = when.strftime("%Y-%m-%d %H:%M:%S")
+        customer = rng.choice(CUSTOMERS)
+        for _ in range(min(rng.randint(1, 8), count - produced)):
+            yield (bill_date, customer, f"Item {rng.randrange(item_count)}", rng.randint(1, 5),
+                   float(rng.randint(5, 2000)))
+            produced += 1
+
+
+def generate_bill_history_csv(path, count, item_count, seed=2):
+    # The legacy bill_history.csv layout, for the importer
+    with open(path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Bill Date", "Customer Name", "Item Name", "Quantity", "Price", "Total Price", "GST",
+                         "Final Price"])
+        lines = []
+        for line in generate_bill_lines(count, item_count, seed):
+            if lines and line[:2] != lines[0][:2]:
+                write_bill_rows(writer, lines)
+                lines = []
+            lines.append(line)
+        if lines:
+            write_bill_rows(writer, lines)
+
+
+def write_bill_rows(writer, lines):
+    total_price = sum(qty * price for _, _, _, qty, price in lines)
+    gst = total_price * main.GST_RATE
+    for bill_date, customer, name, qty, price in lines:
+        writer.writerow([bill_date, customer, name, qty, price, qty * price, gst, total_price + gst])
+
+
+def generate_bills(conn, count, item_count, seed=2, chunk=50000):
+    # The same history written straight into bills/bill_items
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    written = 0
+    lines = []
+    for line in generate_bill_lines(count, item_count, seed):
+        if lines and line[:2] != lines[0][:2]:
+            written += record_generated_bill(cur, lines)
+            if written >= chunk:
+                conn.commit()
+                cur.execute("BEGIN")
+                written = 0
+            lines = []
+        lines.append(line)
+    if lines:
+        record_generated_bill(cur, lines)
+    conn.commit()
+
+
+def record_generated_bill(cur, lines):
+    items = [(name, qty, price, qty * price) for _, _, name, qty, price in lines]
+    total_price = sum(item[3] for item in items)
+    gst = total_price * main.GST_RATE
+    main.record_bill(cur, lines[0][0], lines[0][1], items, total_price, gst, total_price + gst)
+    return len(items)
+
+
+class NullTree:
+    # Stands in for a ttk.Treeview when there is no display
+    def insert(self, parent, index, iid=None, values=()):
+        return iid
+
+    def item(self, iid, values=()):
+        pass
+
+    def delete(self, *iids):
+        pass
+
+    def get_children(self, item=""):
+        return ()
+
+    def set_children(self, item, *children):
+        pass
+
+
+def timed(samples, action, *args):
+    started = time.perf_counter()
+    result = action(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def summarize(scenario, size, samples, **extra):
+    ordered = sorted(samples) or [0.0]
+    result = {
+        "scenario": scenario,
+        "size": size,
+        "ops": len(samples),
+        "seconds": sum(samples),
+        "per_op_ms": {
+            "mean": statistics.fmean(ordered) * 1000,
+            "p50": ordered[len(ordered) // 2] * 1000,
+            "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+            "max": ordered[-1] * 1000,
+        },
+    }
+    result.update(extra)
+    return result
+
+
+# The stock view's SQL paging from before the stock catalog, kept as the
+# baseline the catalog is compared with, and the sort indexes it relied on
+# (the app no longer keeps them; bench_load_data adds them for its SQL runs)
+SQL_PAGING_INDEXES = {"idx_inventory_quantity": "quantity", "idx_inventory_price": "price"}
+
+def stock_order_by(sort, descending):
+    direction = "DESC" if descending else "ASC"
+    if sort == "id":
+        return f"id {direction}"
+    return f"{sort} {direction}, id {direction}"
+
+
+def count_stock(conn, search=None):
+    where, params = "", ()
+    if search:
+        condition, params = main.stock_search_filter(conn, search)
+        where = f"WHERE {condition}"
+    return conn.execute(f"SELECT COUNT(*) FROM inventory {where}", params).fetchone()[0]
+
+
+def fetch_stock_page(conn, sort="id", descending=False, after=None, before=None, limit=50, search=None):
+    # Keyset pagination: up to limit rows following the key `after`, or the
+    # rows just before the key `before`, in display order
+    if sort not in main.STOCK_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort stock by {sort!r}")
+
+    backwards = before is not None
+    anchor = before if backwards else after
+    reverse = descending != backwards  # scan against the natural index order
+
+    conditions, params = [], ()
+    if search:
+        condition, params = main.stock_search_filter(conn, search)
+        conditions.append(condition)
+    if anchor is not None:
+        op = "<" if reverse else ">"
+        if sort == "id":
+            conditions.append(f"id {op} ?")
+            params += (anchor[1],)
+        elif anchor[0] is None:
+            # NULLs sort first ascending and last descending, and compare to nothing,
+            # so a NULL anchor is continued through the other NULLs by id
+            if reverse:
+                conditions.append(f"({sort} IS NULL AND id < ?)")
+            else:
+                conditions.append(f"(({sort} IS NULL AND id > ?) OR {sort} IS NOT NULL)")
+            params += (anchor[1],)
+        elif reverse:
+            conditions.append(f"(({sort}, id) < (?, ?) OR {sort} IS NULL)")
+            params += tuple(anchor)
+        else:
+            conditions.append(f"({sort}, id) > (?, ?)")
+            params += tuple(anchor)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    rows = conn.execute(f"""SELECT id, name, quantity, price FROM inventory {where}
+                            ORDER BY {stock_order_by(sort, reverse)} LIMIT ?""", params + (limit,)).fetchall()
+    if backwards:
+        rows.reverse()
+    return rows
+
+
+def fetch_stock_at(conn, sort="id", descending=False, offset=0, limit=50, search=None):
+    # Positional fetch, only used when the scrollbar is dragged to an arbitrary point
+    if sort not in main.STOCK_SORT_COLUMNS:
+        raise ValueError(f"Cannot sort stock by {sort!r}")
+    where, params = "", ()
+    if search:
+        condition, params = main.stock_search_filter(conn, search)
+        where = f"WHERE {condition}"
+    return conn.execute(f"""SELECT id, name, quantity, price FROM inventory {where}
+                            ORDER BY {stock_order_by(sort, descending)} LIMIT ? OFFSET ?""",
+                        params + (limit, offset)).fetchall()
+
+
+def bench_load_data(conn, size, repeat):
+    # ViewStockPage, through the stock catalog like the page: loading the catalog,
+    # then per sort order the count and first window, keyset scrolling and a
+    # scrollbar jump; and the same reads straight from SQLite for comparison
+    backend = main.LocalBackend()
+    samples = []
+    timed(samples, backend.count_stock)
+    results = [summarize("load_data.catalog_load", size, samples)]
+    page = main.ViewStockPage.PAGE_SIZE + main.ViewStockPage.BUFFER
+    for source, count, fetch_page, fetch_at in (
+            ("catalog", backend.count_stock, backend.fetch_stock_page, backend.fetch_stock_at),
+            ("sql", functools.partial(count_stock, conn), functools.partial(fetch_stock_page, conn),
+             functools.partial(fetch_stock_at, conn))):
+        if source == "sql":
+            for index, column in SQL_PAGING_INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON inventory({column})")
+        for sort in ("id", "name", "price"):
+            first, scroll, jump = [], [], []
+            for _ in range(repeat):
+                timed(first, lambda: (count(), fetch_at(sort, limit=page)))
+                rows = fetch_at(sort, limit=page)
+                for _ in range(20):
+                    if not rows:
+                        break
+                    rows = timed(scroll, fetch_page, sort, False, main.stock_key(rows[-1], sort), None, page)
+                timed(jump, fetch_at, sort, False, size["items"] // 2, page)
+            variant = dict(size, sort=sort, source=source)
+            results.append(summarize("load_data.first_window", variant, first))
+            results.append(summarize("load_data.scroll_page", variant, scroll))
+            results.append(summarize("load_data.jump_middle", variant, jump))
+    for index in SQL_PAGING_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index}")  # the other scenarios run against the app's schema
+    return results
+
+
+def bench_load_bill_history(conn, size, repeat, tree):
+    # SalesPage: full first load into a tree, the all-time summary and one over a date range
+    backend = main.LocalBackend(conn)
+    first, summary, ranged = [], [], []
+    for _ in range(repeat):
+        sync = main.TreeSync(tree)
+
+        def load():
+            rows = backend.bills(0)
+            sync.upsert((row[0], (row[1], row[2], f"{row[3]:.2f}", f"{row[4]:.2f}", f"{row[5]:.2f}"))
+                        for row in rows)
+
+        timed(first, load)
+        timed(summary, backend.sales_summary)
+        timed(ranged, backend.sales_summary, "2024-01-05", "2024-06-20")
+        if hasattr(tree, "delete") and sync.shown:
+            sync.remove(list(sync.shown))
+    return [summarize("load_bill_history.first_load", size, first),
+            summarize("load_bill_history.summary", size, summary),
+            summarize("load_bill_history.range_summary", size, ranged)]
+
+
+def bench_add_item(conn, size, ops):
+    # AddStockPage.add_item: one UPSERT and commit per item, half new and half
+    # existing, written through the stock catalog
+    backend = main.LocalBackend()
+    backend.count_stock()
+    rng = random.Random(3)
+    samples = []
+    for number in range(ops):
+        if number % 2:
+            name, price = conn.execute("SELECT name, price FROM inventory WHERE id = ?",
+                                       (rng.randint(1, size["items"]),)).fetchone()
+        else:
+            name, price = f"Bench item {number}", 1.0
+
+        timed(samples, backend.add_stock, name, 1, price)
+    return [summarize("add_item", size, samples)]
+
+
+def bench_generate_bill(conn, size, ops, lines_per_bill):
+    # ViewStockPage.generate_bill: one checkout transaction per bill, through the stock catalog
+    backend = main.LocalBackend()
+    backend.count_stock()
+    rng = random.Random(4)
+    samples = []
+    for _ in range(ops):
+        lines = [(rng.randint(1, size["items"]), 1) for _ in range(lines_per_bill)]
+        timed(samples, backend.checkout, "Bench", lines)
+    return [summarize("generate_bill", dict(size, lines=lines_per_bill), samples)]
+
+
+def bench_create_pdf(workdir, size, repeat):
+    results = []
+    for lines in (10, 100, 1000):
+        items = [(f"Item {n}", 2, 10.0, 20.0) for n in range(lines)]
+        samples = []
+        for number in range(repeat):
+            filename = os.path.join(workdir, f"bench_{lines}_{number}.pdf")
+            timed(samples, main.create_pdf, items, 20.0 * lines, 3.0 * lines, 23.0 * lines, "Bench", filename,
+                  "2024-01-01 10:00:00")
+        results.append(summarize("create_pdf", dict(size, lines=lines), samples))
+    return results
+
+
+def bench_day_book(conn, workdir, size):
+    busiest = conn.execute("""SELECT substr(date, 1, 10) AS day, COUNT(*) FROM bills
+                              GROUP BY day ORDER BY 2 DESC LIMIT 1""").fetchone()
+    if busiest is None:
+        return []
+    samples = []
+    bills = timed(samples, main.create_invoice_book, busiest[0], os.path.join(workdir, "daybook.pdf"))
+    return [summarize("create_invoice_book", dict(size, bills=bills), samples)]
+
+
+def bench_imports(workdir, size):
+    # import_bill_history and import_stock_csv into a scratch database
+    results = []
+    history_path = os.path.join(workdir, "bill_history.csv")
+    generate_bill_history_csv(history_path, size["bill_rows"], size["items"])
+    stock_path = os.path.join(workdir, "stock.csv")
+    rng = random.Random(5)
+    with open(stock_path, mode="w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["Product Name", "Price", "Quantity"])
+        for number in range(size["items"]):
+            writer.writerow([item_name(rng, number), rng.randint(5, 2000), rng.randint(1, 100)])
+
+    with scratch_database(os.path.join(workdir, "import.db")) as conn:
+        samples = []
+        timed(samples, main.import_bill_history, conn, history_path)
+        results.append(summarize("import_bill_history", size, samples))
+        samples = []
+        timed(samples, main.import_stock_csv, conn, stock_path)
+        results.append(summarize("import_stock_csv", size, samples))
+    return results
+
+
+def bench_export(conn, workdir, size):
+    # export_data: every table to each format, timed, then once more traced for
+    # the peak of Python memory allocated, which should not grow with the data
+    results = []
+    for fmt in main.EXPORT_FORMATS:
+        samples = []
+        written = timed(samples, main.export_data, conn, os.path.join(workdir, "export"), fmt)
+        tracemalloc.start()
+        main.export_data(conn, os.path.join(workdir, "export"), fmt)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results.append(summarize("export", dict(size, format=fmt), samples,
+                                 rows=sum(entry[2] for entry in written),
+                                 bytes=sum(os.path.getsize(entry[1]) for entry in written),
+                                 peak_python_mb=peak / 1e6))
+    return results
+
+
+def contention_terminal(path, journal_mode, number, go, seconds, results):
+    # One till in its own process, checking out random bills as fast as it can
+    main.db = main.Database(path, journal_mode)
+    conn = main.db.connection()
+    rng = random.Random(number)
+    item_count = conn.execute("SELECT MAX(id) FROM inventory").fetchone()[0]
+    latencies, out_of_stock, failed = [], 0, 0
+    go.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        lines = [(rng.randint(1, item_count), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+        started = time.perf_counter()
+        try:
+            main.checkout(conn, f"Terminal {number}", lines)
+            latencies.append(time.perf_counter() - started)
+        except main.OutOfStockError:
+            out_of_stock += 1
+        except sqlite3.OperationalError:
+            failed += 1
+    retries = main.perf_stats.stats.get("checkout busy retry", [0])[0]
+    conn.close()
+    results.put((latencies, out_of_stock, failed, retries))
+
+
+def bench_contention(workdir, terminals, seconds, journal_mode, items=100, stock=50):
+    # Several processes share one database file, as tills on a shop LAN do. Stock
+    # is kept low so it runs out mid-run; afterwards every item's remaining
+    # quantity plus what bills say was sold must equal what it started with.
+    context = multiprocessing.get_context("spawn")
+    path = os.path.join(workdir, f"contention_{terminals}.db")
+    with scratch_database(path, journal_mode) as conn:
+        conn.executemany("INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)",
+                         [(f"Item {number}", stock, 10.0) for number in range(items)])
+        add_lots(conn.cursor())
+        conn.commit()
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+        go = context.Event()
+        results = context.Queue()
+        workers = [context.Process(target=contention_terminal, args=(path, journal_mode, number, go, seconds, results))
+                   for number in range(terminals)]
+        for worker in workers:
+            worker.start()
+        time.sleep(1 + terminals * 0.2)  # let every process import and connect
+        go.set()
+        collected = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        latencies = [latency for result in collected for latency in result[0]]
+        bills = conn.execute("SELECT COUNT(*) FROM bills").fetchone()[0]
+        negative = conn.execute("SELECT COUNT(*) FROM inventory WHERE quantity < 0").fetchone()[0]
+        unaccounted = conn.execute("""SELECT COUNT(*) FROM inventory i
+                                      LEFT JOIN (SELECT inventory_id, SUM(quantity) AS sold FROM bill_items
+                                                 GROUP BY inventory_id) s ON s.inventory_id = i.id
+                                      WHERE i.quantity + COALESCE(s.sold, 0) != ?""", (stock,)).fetchone()[0]
+        # The lots must have given up exactly what was sold
+        unaccounted += conn.execute("""SELECT COUNT(*) FROM inventory i
+                                       JOIN (SELECT inventory_id, SUM(qty_remaining) AS remaining FROM stock_lots
+                                             GROUP BY inventory_id) l ON l.inventory_id = i.id
+                                       WHERE l.remaining != i.quantity""").fetchone()[0]
+    return [summarize("contention", {"terminals": terminals, "journal_mode": mode}, latencies,
+                      bills_per_second=len(latencies) / seconds,
+                      attempts_per_second=sum(len(result[0]) + result[1] + result[2] for result in collected) / seconds,
+                      bills_recorded=bills,
+                      bills_reported=len(latencies),
+                      out_of_stock=sum(result[1] for result in collected),
+                      failed=sum(result[2] for result in collected),
+                      busy_retries=sum(result[3] for result in collected),
+                      oversold_items=negative + unaccounted)]
+
+
+class scratch_database:
+    # Points main.db at a fresh database file for the duration of a block
+    def __init__(self, path, journal_mode=None):
+        self.path = path
+        self.journal_mode = journal_mode
+
+    def __enter__(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+        self.previous = main.db
+        main.db = main.Database(self.path, self.journal_mode)
+        return main.db.connection()
+
+    def __exit__(self, *exc):
+        main.db.connection().close()
+        main.db = self.previous
+        return False
+
+
+def make_tree(use_tk):
+    if not use_tk:
+        return NullTree(), None
+    import tkinter as tk
+    from tkinter import ttk
+    root = tk.Tk()
+    root.withdraw()
+    return ttk.Treeview(root, columns=("Date", "Customer", "Total", "GST", "Final"), show="headings"), root
+
+
+def run(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="inventory-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    tree, root = make_tree(args.tk)
+    results = []
+    for items in args.items:
+        for bill_rows in args.bill_rows:
+            size = {"items": items, "bill_rows": bill_rows}
+            print(f"Generating {items} items and {bill_rows} bill lines...", file=sys.stderr)
+            with scratch_database(os.path.join(workdir, f"bench_{items}_{bill_rows}.db")) as conn:
+                started = time.perf_counter()
+                generate_inventory(conn, items)
+                generate_bills(conn, bill_rows, items)
+                print(f"  generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+                wanted = set(args.scenarios)
+                if "load_data" in wanted:
+                    results += bench_load_data(conn, size, args.repeat)
+                if "load_bill_history" in wanted:
+                    results += bench_load_bill_history(conn, size, args.repeat, tree)
+                if "add_item" in wanted:
+                    results += bench_add_item(conn, size, args.ops)
+                if "generate_bill" in wanted:
+                    results += bench_generate_bill(conn, size, args.ops, 5)
+                    results += bench_generate_bill(conn, size, max(1, args.ops // 10), 100)
+                if "create_pdf" in wanted:
+                    results += bench_create_pdf(workdir, size, args.repeat)
+                    results += bench_day_book(conn, workdir, size)
+                if "export" in wanted:
+                    results += bench_export(conn, workdir, size)
+            if "imports" in set(args.scenarios):
+                results += bench_imports(workdir, size)
+            for result in results:
+                if result["size"].get("items") == items and result["size"].get("bill_rows") == bill_rows \
+                        and not result.get("reported"):
+                    result["reported"] = True
+                    variant = " ".join(f"{key}={value}" for key, value in result["size"].items()
+                                       if key not in ("items", "bill_rows"))
+                    print(f"  {result['scenario'] + ' ' + variant:<40} {result['per_op_ms']['p50']:10.3f} ms p50"
+                          f" {result['per_op_ms']['p95']:10.3f} ms p95  ({result['ops']} ops)", file=sys.stderr)
+    if "contention" in set(args.scenarios):
+        print(f"Contention, {args.seconds}s per run...", file=sys.stderr)
+        for terminals in args.terminals:
+            result = bench_contention(workdir, terminals, args.seconds, args.journal_mode)[0]
+            results.append(result)
+            print(f"  {terminals:2d} terminals {result['bills_per_second']:9.1f} bills/s"
+                  f" {result['per_op_ms']['p95']:9.2f} ms p95  {result['busy_retries']} retries"
+                  f"  {result['failed']} failed  {result['oversold_items']} oversold", file=sys.stderr)
+    if root is not None:
+        root.destroy()
+    for result in results:
+        result.pop("reported", None)
+    return results
+
+
+SCENARIOS = ["load_data", "load_bill_history", "add_item", "generate_bill", "create_pdf", "imports", "export", "contention"]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory app's hot paths")
+    parser.add_argument("--items", type=int, action="append", help="inventory sizes (repeatable, default 1000)")
+    parser.add_argument("--bill-rows", type=int, action="append", help="bill history sizes (repeatable, default 10000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset of " +
+                        ", ".join(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of read scenarios")
+    parser.add_argument("--ops", type=int, default=200, help="operations for add_item / generate_bill")
+    parser.add_argument("--tk", action="store_true", help="time treeview updates on a real Tk widget "
+                                                          "(needs a display, e.g. xvfb-run)")
+    parser.add_argument("--terminals", default="1,2,4,8,16", help="process counts for the contention scenario")
+    parser.add_argument("--seconds", type=float, default=3, help="length of each contention run")
+    parser.add_argument("--journal-mode", type=str.upper, help="journal mode for the contention databases "
+                                                               "(default as in the app, e.g. DELETE to mimic a LAN share)")
+    parser.add_argument("--workdir", help="where scratch databases and PDFs go (default: a temp folder)")
+    parser.add_argument("--out", default="bench_results.json", help="JSON results file")
+    args = parser.parse_args(argv)
+    args.items = args.items or [1000]
+    args.bill_rows = args.bill_rows or [10000]
+    args.terminals = [int(count) for count in args.terminals.split(",")]
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = run(args)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "args": {key: value for key, value in vars(args).items() if key != "out"},
+        "results": results,
+    }
+    with open(args.out, mode="w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {len(results)} results to {args.out}", file=sys.stderr)
+
+    # Contention runs double as a stress test: any oversold item or bill that
+    # failed outright is a bug, so the run fails
+    broken = [result for result in results if result["scenario"] == "contention"
+              and (result["oversold_items"] or result["failed"])]
+    for result in broken:
+        print(f"FAIL: contention with {result['size']['terminals']} terminals: {result['oversold_items']} oversold "
+              f"items, {result['failed']} failed bills", file=sys.stderr)
+    return 1 if broken else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
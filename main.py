@@ -1,13 +1,28 @@
+import time
+started_at = time.perf_counter()  # for the startup timing report
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import sqlite3
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from tkinter import simpledialog
-from datetime import datetime
+from datetime import datetime, timedelta
+import functools
 import os
 import csv
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import locale
+import queue
+import threading
 import sys
+import math
+import random
+import bisect
+import operator
+import gzip
+import hashlib
 
 if getattr(sys, 'frozen', False):
     base_dir = os.path.dirname(sys.executable)  # exe folder
@@ -16,55 +31,1077 @@ else:
 
 db_path = os.path.join(base_dir, 'data.db')
 csv_path = os.path.join(base_dir, 'output.csv')
+bill_history_path = os.path.join(base_dir, 'bill_history.csv')
 
-# Use db_path when connecting SQLite:
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-cursor.execute("""CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE,
-    password TEXT
-)""")
-
-cursor.execute("""CREATE TABLE IF NOT EXISTS inventory (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    quantity INTEGER,
-    price REAL
-)""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS bills (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    date TEXT,
-    items TEXT,
-    total_price REAL,
-    gst REAL,
-    final_price REAL
-)
-""")
-
-conn.commit()
+startup_marks = []  # (label, seconds since start)
 
 
-class InventoryApp(tk.Tk):
+def mark_startup(label):
+    startup_marks.append((label, time.perf_counter() - started_at))
+
+
+def startup_report():
+    return "\n".join(f"{seconds * 1000:8.1f} ms  {label}" for label, seconds in startup_marks)
+
+
+class PerfStats:
+    # Timing histograms for named operations (page actions, SQL statements, tree
+    # refreshes, imports, PDFs). Samples land in log-spaced buckets, four per
+    # doubling from 1 us, so memory stays fixed however long the app runs and
+    # percentiles are accurate to about 19%.
+    BUCKETS_PER_DOUBLING = 4
+    BUCKET_COUNT = 4 * 32  # up to ~70 minutes
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self.stats = {}  # Key = operation name, Value = [count, total seconds, max seconds, buckets]
+        self.profiler = None
+        self.profile_text = ""
+
+    def record(self, name, seconds):
+        micros = seconds * 1e6
+        index = 0 if micros <= 1 else min(self.BUCKET_COUNT - 1,
+                                          math.ceil(math.log2(micros) * self.BUCKETS_PER_DOUBLING))
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, 0.0, [0] * self.BUCKET_COUNT]
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds > stat[2]:
+                stat[2] = seconds
+            stat[3][index] += 1
+
+    def percentile(self, stat, fraction):
+        # Upper edge of the bucket holding the sample at that rank, in seconds
+        count, _, longest, buckets = stat
+        wanted = max(1, math.ceil(count * fraction))
+        seen = 0
+        for index, hits in enumerate(buckets):
+            seen += hits
+            if seen >= wanted:
+                return min(longest, 2 ** (index / self.BUCKETS_PER_DOUBLING) / 1e6)
+        return longest
+
+    def rows(self):
+        # (name, count, mean ms, p50 ms, p95 ms, p99 ms, max ms), most total time first
+        with self.lock:
+            stats = [(name, stat[0], stat[1], stat[2], list(stat[3])) for name, stat in self.stats.items()]
+        stats.sort(key=lambda stat: stat[2], reverse=True)
+        return [(name, count, total / count * 1000,
+                 *(self.percentile((count, total, longest, buckets), fraction) * 1000
+                   for fraction in (0.50, 0.95, 0.99)),
+                 longest * 1000)
+                for name, count, total, longest, buckets in stats]
+
+    def report(self):
+        lines = [f"{'operation':<60} {'count':>7} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)"]
+        for name, count, *times in self.rows():
+            lines.append(f"{name[:60]:<60} {count:7d} " + " ".join(f"{value:9.2f}" for value in times))
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.stats.clear()
+
+    def toggle_profile(self):
+        # Starts or stops a cProfile capture of the calling (UI) thread; returns
+        # True while capturing. Stopping keeps the top functions in profile_text.
+        import cProfile
+        import pstats
+        import io
+        if self.profiler is None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            return True
+        self.profiler.disable()
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        self.profile_text = text.getvalue()
+        self.profiler = None
+        return False
+
+
+perf_stats = PerfStats()
+
+
+def timed(name):
+    # Decorator recording each call's duration in perf_stats under name
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                perf_stats.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+@functools.lru_cache(maxsize=1024)
+def sql_label(sql):
+    return "sql: " + " ".join(sql.split())
+
+
+class TimedCursor(sqlite3.Cursor):
+    # Records how long each statement takes to run; rows fetched afterwards
+    # are not included
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            perf_stats.record(sql_label(sql), time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            perf_stats.record(sql_label(sql), time.perf_counter() - started)
+
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+def create_schema(conn):
+    cursor = conn.cursor()
+    cursor.execute("""CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password TEXT
+    )""")
+
+    cursor.execute("""CREATE TABLE IF NOT EXISTS inventory (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        quantity INTEGER,
+        price REAL
+    )""")
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS bills (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        items TEXT,
+        total_price REAL,
+        gst REAL,
+        final_price REAL
+    )
+    """)
+
+    conn.commit()
+
+
+def add_column(cur, table, column, decl):
+    # ALTER TABLE has no IF NOT EXISTS for columns
+    columns = [row[1] for row in cur.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def migrate_bill_items(cur):
+    # Bills become a header row per bill plus one bill_items row per line item
+    add_column(cur, "bills", "customer_name", "TEXT")
+    cur.execute("""CREATE TABLE IF NOT EXISTS bill_items (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        bill_id INTEGER NOT NULL REFERENCES bills(id) ON DELETE CASCADE,
+        item_name TEXT,
+        quantity INTEGER,
+        price REAL,
+        total_price REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bills_date ON bills(date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bills_customer ON bills(customer_name, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bill_items_bill ON bill_items(bill_id)")
+    cur.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def migrate_stock_sort_indexes(cur):
+    # Lets the stock grid page through any sort column without a table scan;
+    # each index implicitly ends in the rowid, which is the tie breaker
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_name ON inventory(name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_quantity ON inventory(quantity)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_price ON inventory(price)")
+
+
+def migrate_stock_lookup_index(cur):
+    # Stock is merged on (name, price); without this every merge is a table scan
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_inventory_name_price ON inventory(name, price)")
+
+
+def migrate_unique_stock(cur):
+    # One inventory row per (name, price): fold existing duplicates into the
+    # oldest row, then make the lookup index unique so adds can UPSERT
+    cur.execute("""UPDATE inventory SET quantity = (
+                       SELECT SUM(d.quantity) FROM inventory d WHERE d.name = inventory.name AND d.price = inventory.price)
+                   WHERE id IN (SELECT MIN(id) FROM inventory GROUP BY name, price HAVING COUNT(*) > 1)""")
+    cur.execute("DELETE FROM inventory WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY name, price)")
+    cur.execute("DROP INDEX IF EXISTS idx_inventory_name_price")
+    cur.execute("CREATE UNIQUE INDEX idx_inventory_name_price ON inventory(name, price)")
+
+
+def migrate_bill_item_stock_ids(cur):
+    # Bill lines remember which inventory row they were sold from
+    add_column(cur, "bill_items", "inventory_id", "INTEGER")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bill_items_inventory ON bill_items(inventory_id)")
+
+
+def migrate_stock_search(cur):
+    # Full-text index over item names, kept in step with inventory by triggers.
+    # Trigram matching finds any substring; builds without it fall back to word
+    # prefixes, and builds without FTS5 to a name prefix range on idx_inventory_name.
+    mode = "none"
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            cur.execute(f"""CREATE VIRTUAL TABLE inventory_fts USING fts5(
+                name, content='inventory', content_rowid='id', tokenize='{tokenizer}')""")
+        except sqlite3.OperationalError:
+            continue
+        mode = tokenizer
+        break
+    if mode != "none":
+        cur.execute("""CREATE TRIGGER inventory_fts_insert AFTER INSERT ON inventory BEGIN
+            INSERT INTO inventory_fts (rowid, name) VALUES (new.id, new.name);
+        END""")
+        cur.execute("""CREATE TRIGGER inventory_fts_delete AFTER DELETE ON inventory BEGIN
+            INSERT INTO inventory_fts (inventory_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        END""")
+        # Only renames touch the index; stock movements leave it alone
+        cur.execute("""CREATE TRIGGER inventory_fts_rename AFTER UPDATE OF name ON inventory BEGIN
+            INSERT INTO inventory_fts (inventory_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO inventory_fts (rowid, name) VALUES (new.id, new.name);
+        END""")
+        cur.execute("INSERT INTO inventory_fts (inventory_fts) VALUES ('rebuild')")
+    set_meta(cur, "stock_search", mode)
+
+
+def migrate_sales_rollups(cur):
+    # Running sales totals per day, month and item, kept up to date by
+    # record_bill, so sales over a date range don't rescan the bill history
+    cur.execute("""CREATE TABLE sales_daily (
+        day TEXT PRIMARY KEY, bills INTEGER NOT NULL, sales REAL NOT NULL, cost REAL NOT NULL) WITHOUT ROWID""")
+    cur.execute("""CREATE TABLE sales_monthly (
+        month TEXT PRIMARY KEY, bills INTEGER NOT NULL, sales REAL NOT NULL, cost REAL NOT NULL) WITHOUT ROWID""")
+    cur.execute("""CREATE TABLE sales_item (
+        item_name TEXT PRIMARY KEY, quantity INTEGER NOT NULL, sales REAL NOT NULL) WITHOUT ROWID""")
+    cur.execute("""INSERT INTO sales_daily (day, bills, sales, cost)
+                   SELECT COALESCE(substr(b.date, 1, 10), ''), COUNT(*), COALESCE(SUM(b.final_price), 0),
+                          COALESCE(SUM(c.cost), 0)
+                   FROM bills b LEFT JOIN (SELECT bill_id, SUM(quantity * price) AS cost
+                                          FROM bill_items GROUP BY bill_id) c ON c.bill_id = b.id
+                   GROUP BY 1""")
+    cur.execute("""INSERT INTO sales_monthly (month, bills, sales, cost)
+                   SELECT substr(day, 1, 7), SUM(bills), SUM(sales), SUM(cost) FROM sales_daily GROUP BY 1""")
+    cur.execute("""INSERT INTO sales_item (item_name, quantity, sales)
+                   SELECT COALESCE(item_name, ''), SUM(quantity), SUM(quantity * price) FROM bill_items GROUP BY 1""")
+    cur.execute("CREATE INDEX idx_sales_item_quantity ON sales_item(quantity)")
+
+
+def migrate_stock_changes(cur):
+    # Ids of inventory rows as they are inserted, changed or deleted, so an
+    # in-memory catalog can re-read just those after another terminal's commit.
+    # Every 10000th entry trims the log to the last 10000; a catalog that fell
+    # further behind reloads everything.
+    cur.execute("CREATE TABLE stock_changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, item_id INTEGER NOT NULL)")
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        cur.execute(f"""CREATE TRIGGER stock_changes_{event.lower()} AFTER {event} ON inventory BEGIN
+            INSERT INTO stock_changes (item_id) VALUES ({row}.id);
+        END""")
+    cur.execute("""CREATE TRIGGER stock_changes_trim AFTER INSERT ON stock_changes WHEN new.seq % 10000 = 0 BEGIN
+        DELETE FROM stock_changes WHERE seq <= new.seq - 10000;
+    END""")
+
+
+def migrate_stock_lots(cur):
+    # A lot per stock receipt with its unit cost; checkout takes quantity from an
+    # item's oldest open lots first and stores what that cost on the bill line.
+    # The partial index holds only open lots, so the FIFO queue of an item stays
+    # short however much history it has. Existing stock becomes one lot per row
+    # costed at its price, the only figure known for it.
+    cur.execute("""CREATE TABLE stock_lots (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        inventory_id INTEGER NOT NULL,
+        received_at TEXT NOT NULL,
+        unit_cost REAL NOT NULL,
+        quantity INTEGER NOT NULL,
+        qty_remaining INTEGER NOT NULL)""")
+    cur.execute("CREATE INDEX idx_stock_lots_open ON stock_lots(inventory_id, id) WHERE qty_remaining > 0")
+    # Removing an item writes off what is left of its lots; used up lots stay as receipt history
+    cur.execute("""CREATE TRIGGER stock_lots_delete AFTER DELETE ON inventory BEGIN
+        DELETE FROM stock_lots WHERE inventory_id = old.id AND qty_remaining > 0;
+    END""")
+    cur.execute("""INSERT INTO stock_lots (inventory_id, received_at, unit_cost, quantity, qty_remaining)
+                   SELECT id, datetime('now', 'localtime'), COALESCE(price, 0), quantity, quantity
+                   FROM inventory WHERE quantity > 0 ORDER BY id""")
+
+    # Cost of goods sold per bill line, and GST kept apart in the rollups so
+    # profit is sales less GST less cost. Older lines have no recorded cost and
+    # count at their price, as the rollups already did.
+    add_column(cur, "bill_items", "cost", "REAL")
+    add_column(cur, "sales_daily", "gst", "REAL NOT NULL DEFAULT 0")
+    add_column(cur, "sales_monthly", "gst", "REAL NOT NULL DEFAULT 0")
+    add_column(cur, "sales_item", "cost", "REAL NOT NULL DEFAULT 0")
+    cur.execute("""CREATE TEMP TABLE gst_by_day (day TEXT PRIMARY KEY, gst REAL NOT NULL) WITHOUT ROWID""")
+    cur.execute("""INSERT INTO gst_by_day (day, gst)
+                   SELECT COALESCE(substr(date, 1, 10), ''), COALESCE(SUM(gst), 0) FROM bills GROUP BY 1""")
+    cur.execute("""UPDATE sales_daily SET gst = COALESCE(
+                       (SELECT g.gst FROM gst_by_day g WHERE g.day = sales_daily.day), 0)""")
+    cur.execute("DROP TABLE temp.gst_by_day")
+    cur.execute("""UPDATE sales_monthly SET gst = (
+                       SELECT COALESCE(SUM(d.gst), 0) FROM sales_daily d
+                       WHERE substr(d.day, 1, 7) = sales_monthly.month)""")
+    cur.execute("UPDATE sales_item SET cost = sales")
+
+
+def migrate_low_stock(cur):
+    # A reorder level per item and a low_stock flag kept by triggers, so the
+    # Dashboard watchlist reads a partial index holding only the low items
+    # instead of scanning inventory. An item is low once its quantity is at or
+    # below its reorder level; the default of 0 lists items that ran out.
+    add_column(cur, "inventory", "reorder_level", "INTEGER NOT NULL DEFAULT 0")
+    add_column(cur, "inventory", "low_stock", "INTEGER NOT NULL DEFAULT 0")
+    cur.execute("UPDATE inventory SET low_stock = 1 WHERE COALESCE(quantity, 0) <= reorder_level")
+    cur.execute("CREATE INDEX idx_inventory_low_stock ON inventory(quantity) WHERE low_stock = 1")
+    cur.execute("""CREATE TRIGGER inventory_low_stock_insert AFTER INSERT ON inventory
+                   WHEN COALESCE(new.quantity, 0) <= new.reorder_level BEGIN
+        UPDATE inventory SET low_stock = 1 WHERE id = new.id;
+    END""")
+    # The flag is only written when it flips, so most sales cost just the WHEN check
+    cur.execute("""CREATE TRIGGER inventory_low_stock_update AFTER UPDATE OF quantity, reorder_level ON inventory
+                   WHEN (COALESCE(new.quantity, 0) <= new.reorder_level) != new.low_stock BEGIN
+        UPDATE inventory SET low_stock = (COALESCE(new.quantity, 0) <= new.reorder_level) WHERE id = new.id;
+    END""")
+
+
+def migrate_imported_bills(cur):
+    # Which bills were imported from which bill history CSV, so a file that was
+    # rewritten can have its bills taken back out before it is read again.
+    # Bills imported before this table existed can't be told apart.
+    cur.execute("CREATE TABLE imported_bills (bill_id INTEGER PRIMARY KEY, source TEXT NOT NULL)")
+    cur.execute("CREATE INDEX idx_imported_bills_source ON imported_bills(source)")
+
+
+def migrate_drop_stock_sort_indexes(cur):
+    # The stock grid is sorted in memory by StockCatalog now, so the quantity and
+    # price indexes only cost every sale and restock an extra index write.
+    # idx_inventory_name stays for the name prefix search.
+    cur.execute("DROP INDEX IF EXISTS idx_inventory_quantity")
+    cur.execute("DROP INDEX IF EXISTS idx_inventory_price")
+
+
+# Schema changes are applied in order and tracked through PRAGMA user_version
+MIGRATIONS = [
+    migrate_bill_items,
+    migrate_stock_sort_indexes,
+    migrate_stock_lookup_index,
+    migrate_unique_stock,
+    migrate_bill_item_stock_ids,
+    migrate_stock_search,
+    migrate_sales_rollups,
+    migrate_stock_changes,
+    migrate_stock_lots,
+    migrate_low_stock,
+    migrate_imported_bills,
+    migrate_drop_stock_sort_indexes,
+]
+
+
+def migrate(conn):
+    # Each step runs under the write lock and user_version is read again once
+    # it is held, so terminals sharing the database that upgrade at the same
+    # time take turns, and the later ones skip what was already applied
+    for number, step in enumerate(MIGRATIONS, start=1):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= number:
+            continue
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            if cur.execute("PRAGMA user_version").fetchone()[0] < number:
+                step(cur)
+                cur.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_meta(cur, key, value):
+    cur.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def record_bill(cur, bill_date, customer_name, items, total_price, gst, final_price, rollup=True):
+    # items are (name, qty, price, line total[, inventory id[, cost]]) tuples; returns the new bill id.
+    # Callers writing many bills pass rollup=False and call add_to_rollups once for the lot.
+    cur.execute("INSERT INTO bills (date, customer_name, total_price, gst, final_price) VALUES (?, ?, ?, ?, ?)",
+                (bill_date, customer_name, total_price, gst, final_price))
+    bill_id = cur.lastrowid
+    cur.executemany("""INSERT INTO bill_items (bill_id, item_name, quantity, price, total_price, inventory_id, cost)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    [(bill_id, item[0], item[1], item[2], item[3], item[4] if len(item) > 4 else None,
+                      item[5] if len(item) > 5 else None)
+                     for item in items])
+    if rollup:
+        add_to_rollups(cur, [(bill_date, final_price, gst, items)])
+    return bill_id
+
+
+def line_cost(item):
+    # Cost of goods sold for a bill line; lines without a recorded cost count at their price
+    if len(item) > 5 and item[5] is not None:
+        return item[5]
+    return item[1] * item[2]
+
+
+def add_to_rollups(cur, bills, sign=1):
+    # Adds [(bill date, final price, gst, items)] to sales_daily, sales_monthly and
+    # sales_item; sign=-1 takes them back out
+    days = {}
+    item_totals = {}
+    for bill_date, final_price, gst, items in bills:
+        day = days.setdefault((bill_date or "")[:10], [0, 0.0, 0.0, 0.0])
+        day[0] += 1
+        day[1] += final_price
+        day[3] += gst
+        for item in items:
+            cost = line_cost(item)
+            day[2] += cost
+            totals = item_totals.setdefault(item[0] or "", [0, 0.0, 0.0])
+            totals[0] += item[1]
+            totals[1] += item[1] * item[2]
+            totals[2] += cost
+    months = {}
+    for day, totals in days.items():
+        month = months.setdefault(day[:7], [0, 0.0, 0.0, 0.0])
+        for i, value in enumerate(totals):
+            month[i] += value
+
+    cur.executemany("""INSERT INTO sales_daily (day, bills, sales, cost, gst) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(day) DO UPDATE SET bills = bills + excluded.bills,
+                           sales = sales + excluded.sales, cost = cost + excluded.cost, gst = gst + excluded.gst""",
+                    [(day, *(sign * value for value in totals)) for day, totals in days.items()])
+    cur.executemany("""INSERT INTO sales_monthly (month, bills, sales, cost, gst) VALUES (?, ?, ?, ?, ?)
+                       ON CONFLICT(month) DO UPDATE SET bills = bills + excluded.bills,
+                           sales = sales + excluded.sales, cost = cost + excluded.cost, gst = gst + excluded.gst""",
+                    [(month, *(sign * value for value in totals)) for month, totals in months.items()])
+    cur.executemany("""INSERT INTO sales_item (item_name, quantity, sales, cost) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(item_name) DO UPDATE SET quantity = quantity + excluded.quantity,
+                           sales = sales + excluded.sales, cost = cost + excluded.cost""",
+                    [(name, *(sign * value for value in totals)) for name, totals in item_totals.items()])
+
+
+GST_RATE = 0.15
+
+
+class OutOfStockError(Exception):
+    # Raised by checkout when items no longer have the quantity asked for
+    def __init__(self, names):
+        super().__init__("Not enough stock for: " + ", ".join(names))
+        self.names = names
+
+
+def receive_lot(cur, item_id, qty, unit_cost, received_at=None):
+    # Books qty units of stock received at unit_cost as a new lot of the item
+    if qty > 0:
+        cur.execute("""INSERT INTO stock_lots (inventory_id, received_at, unit_cost, quantity, qty_remaining)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (item_id, received_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S"), unit_cost, qty, qty))
+
+
+def consume_lots(cur, item_id, qty, fallback_cost):
+    # Takes qty from the item's oldest open lots and returns what it cost. Stock
+    # without lots (quantities edited outside the app) is costed at fallback_cost.
+    cost = 0.0
+    used = []
+    for lot_id, remaining, unit_cost in cur.connection.execute(
+            """SELECT id, qty_remaining, unit_cost FROM stock_lots
+               WHERE inventory_id = ? AND qty_remaining > 0 ORDER BY id""", (item_id,)):
+        take = min(qty, remaining)
+        used.append((take, lot_id))
+        cost += take * unit_cost
+        qty -= take
+        if qty == 0:
+            break
+    cur.executemany("UPDATE stock_lots SET qty_remaining = qty_remaining - ? WHERE id = ?", used)
+    return cost + qty * fallback_cost
+
+
+def sell_items(cur, customer_name, lines, bill_date):
+    # Deducts [(inventory id, quantity)] by id only where enough is left, consumes
+    # the stock lots FIFO and writes the bill with its items, inside the caller's
+    # transaction. Returns (bill id, items, total, gst, final price); items are
+    # (name, qty, price, line total, inventory id, cost).
+    quantities = {}
+    for item_id, qty in lines:
+        if qty <= 0:
+            raise ValueError(f"Quantity for item {item_id} must be positive")
+        quantities[item_id] = quantities.get(item_id, 0) + qty
+    if not quantities:
+        raise ValueError("A bill needs at least one item")
+
+    # Names and prices come from the database, not from what a view last showed
+    ids = list(quantities)
+    placeholders = ", ".join("?" * len(ids))
+    stock = {row[0]: row for row in cur.execute(
+        f"SELECT id, name, quantity, price FROM inventory WHERE id IN ({placeholders})", ids)}
+
+    cur.executemany("UPDATE inventory SET quantity = quantity - ? WHERE id = ? AND quantity >= ?",
+                    [(qty, item_id, qty) for item_id, qty in quantities.items()])
+    if cur.rowcount != len(quantities):
+        short = [stock[item_id][1] if item_id in stock else f"item {item_id}"
+                 for item_id, qty in quantities.items()
+                 if item_id not in stock or stock[item_id][2] < qty]
+        raise OutOfStockError(short)
+
+    items = []
+    for item_id, qty in quantities.items():
+        _, name, _, price = stock[item_id]
+        items.append((name, qty, price, qty * price, item_id, consume_lots(cur, item_id, qty, price)))
+    total_price = sum(item[3] for item in items)
+    gst = total_price * GST_RATE
+    final_price = total_price + gst
+    bill_id = record_bill(cur, bill_date, customer_name, items, total_price, gst, final_price)
+    return bill_id, items, total_price, gst, final_price
+
+
+CHECKOUT_ATTEMPTS = 5
+TILL_BUSY_TIMEOUT = 200  # ms per attempt when the Tk thread checks out: about 2 s in all, not 25
+
+
+def is_busy(error):
+    # Another terminal holds the lock for longer than busy_timeout
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error))
+
+
+def busy_pause(attempt):
+    # Growing, jittered pause before the next try at a busy lock
+    pause = min(1.0, 0.05 * 2 ** attempt) * random.uniform(0.5, 1.5)
+    perf_stats.record("checkout busy retry", pause)
+    return pause
+
+
+def begin_immediate(cur, attempts=CHECKOUT_ATTEMPTS):
+    # Takes the write lock, retrying like checkout while another terminal holds it
+    for attempt in range(attempts):
+        try:
+            cur.execute("BEGIN IMMEDIATE")
+            return
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == attempts - 1:
+                raise
+            time.sleep(busy_pause(attempt))
+
+
+def checkout(conn, customer_name, lines, bill_date=None, attempts=CHECKOUT_ATTEMPTS, busy_timeout=None):
+    # Sells one bill in its own transaction; nothing is kept on error. BEGIN
+    # IMMEDIATE takes the write lock before stock is read, so terminals sharing
+    # the database queue up instead of failing halfway; if the lock stays busy
+    # the whole bill is retried a few times with growing, jittered pauses.
+    # busy_timeout (ms) shortens each wait for the lock, for callers that
+    # can't block for long.
+    if bill_date is None:
+        bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.cursor()
+    if conn.in_transaction:
+        conn.rollback()  # left open by a write that failed without cleaning up; BEGIN would refuse to nest
+    if busy_timeout is not None:
+        usual_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+    try:
+        for attempt in range(attempts):
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                result = sell_items(cur, customer_name, lines, bill_date)
+                conn.commit()
+                return result
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not is_busy(e) or attempt == attempts - 1:
+                    raise
+                time.sleep(busy_pause(attempt))
+    finally:
+        if busy_timeout is not None:
+            conn.execute(f"PRAGMA busy_timeout = {usual_timeout}")
+
+
+def on_network_drive(path):
+    # UNC paths and mapped network drives on Windows
+    path = os.path.abspath(path)
+    if path.startswith("\\\\"):
+        return True
+    if sys.platform == "win32":
+        import ctypes
+        drive = os.path.splitdrive(path)[0] + "\\"
+        return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+    return False
+
+
+def default_journal_mode(path):
+    # WAL needs shared memory between processes, which a database on a network
+    # share doesn't get; there terminals use a rollback journal instead.
+    # INVENTORY_JOURNAL_MODE (e.g. DELETE or WAL) overrides the guess.
+    mode = os.environ.get("INVENTORY_JOURNAL_MODE")
+    if mode:
+        return mode.upper()
+    return "DELETE" if on_network_drive(path) else "WAL"
+
+
+class Database:
+    # Hands out SQLite connections tuned for this app: WAL journaling so readers
+    # don't wait on the writer, one connection per thread, and a larger cache of
+    # prepared statements. The schema is created and migrated on first connect.
+    PRAGMAS = (
+        "PRAGMA cache_size = -32768",  # 32 MB page cache
+        "PRAGMA busy_timeout = 5000",
+    )
+    WAL_PRAGMAS = (
+        "PRAGMA synchronous = NORMAL",  # with WAL a commit no longer waits for fsync
+        "PRAGMA mmap_size = 268435456",  # read through a 256 MB memory map
+    )
+
+    def __init__(self, path, journal_mode=None):
+        self.path = path
+        self.journal_mode = journal_mode or default_journal_mode(path)
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ready = False
+
+    def connect(self, check_same_thread=True):
+        conn = sqlite3.connect(self.path, timeout=5, cached_statements=256, factory=TimedConnection,
+                               check_same_thread=check_same_thread)
+        mode = conn.execute(f"PRAGMA journal_mode = {self.journal_mode}").fetchone()[0]
+        for pragma in self.PRAGMAS + (self.WAL_PRAGMAS if mode == "wal" else ()):
+            conn.execute(pragma)
+        with self.lock:
+            if not self.ready:
+                create_schema(conn)
+                migrate(conn)
+                self.ready = True
+        return conn
+
+    def connection(self):
+        # The calling thread's connection, opened on first use
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = self.connect()
+        return conn
+
+
+db = Database(db_path)
+
+
+class StockItem:
+    # One inventory row held by StockCatalog
+    __slots__ = ("id", "name", "quantity", "price")
+
+    def __init__(self, item_id, name, quantity, price):
+        self.id = item_id
+        self.name = name
+        self.quantity = quantity
+        self.price = price
+
+    def row(self):
+        return self.id, self.name, self.quantity, self.price
+
+
+class StockCatalog:
+    # Every inventory row held in memory, keyed by id and by (name, price), with
+    # the ids in (sort value, id) order per sort column, built on first use.
+    # Stock is read from here and written through it to SQLite. Commits made by
+    # other connections show up in PRAGMA data_version; the stock_changes log
+    # then says which rows to re-read, so a sale at another terminal costs a
+    # few lookups rather than a reload.
+    FULL_RELOAD_SHARE = 4  # reload everything when over 1/4 of the rows changed
+
+    def __init__(self):
+        self.conn = None  # connection the rows were read through
+        self.items = None  # Key = id, Value = StockItem
+        self.by_name_price = {}  # Key = (name, price), Value = StockItem
+        self.views = {}  # Key = sort column, Value = ids in ascending order
+        self.search_view = None  # (search, sort, matching ids in ascending order)
+        self.version = None
+        self.seq = 0  # last stock_changes entry applied
+
+    def refresh(self, conn):
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.items is not None and conn is self.conn and version == self.version:
+            return
+        if self.items is None or conn is not self.conn:
+            self.load(conn)
+        else:
+            first = conn.execute("SELECT MIN(seq) FROM stock_changes").fetchone()[0]
+            changes = conn.execute("SELECT seq, item_id FROM stock_changes WHERE seq > ?", (self.seq,)).fetchall()
+            if first is not None and first > self.seq + 1:
+                self.load(conn)  # the log was trimmed past what this catalog has seen
+            elif changes:
+                ids = {item_id for _, item_id in changes}
+                if len(ids) * self.FULL_RELOAD_SHARE > len(self.items):
+                    self.load(conn)
+                else:
+                    self.seq = changes[-1][0]
+                    self.reload(conn, ids)
+        self.version = version
+
+    def load(self, conn):
+        # The log position is read first: changes committed while rows are
+        # being read are applied (again) on the next refresh
+        self.conn = conn
+        self.seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM stock_changes").fetchone()[0]
+        self.items = {row[0]: StockItem(*row) for row in conn.execute("SELECT id, name, quantity, price FROM inventory")}
+        self.by_name_price = {(item.name, item.price): item for item in self.items.values()}
+        self.views = {}
+        self.search_view = None
+
+    def sort_key(self, sort):
+        # Orders ids like SQLite orders (value, id): NULLs first, then by value
+        if sort == "id":
+            return None
+        if sort not in STOCK_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort stock by {sort!r}")
+        items = self.items
+        get = operator.attrgetter(sort)
+
+        def key(item_id):
+            value = get(items[item_id])
+            return value is not None, value if value is not None else 0, item_id
+        return key
+
+    def anchor_key(self, sort, anchor):
+        if sort == "id":
+            return anchor[1]
+        value, item_id = anchor
+        return value is not None, value if value is not None else 0, item_id
+
+    def view(self, conn, sort, search=None):
+        self.refresh(conn)
+        view = self.views.get(sort)
+        if view is None:
+            view = self.views[sort] = sorted(self.items, key=self.sort_key(sort))
+        if not search:
+            return view
+        if self.search_view is None or self.search_view[:2] != (search, sort):
+            # Matching is left to the search index; only the ordering is done here
+            condition, params = stock_search_filter(conn, search)
+            matches = {row[0] for row in conn.execute(f"SELECT id FROM inventory WHERE {condition}", params)}
+            self.search_view = (search, sort, [item_id for item_id in view if item_id in matches])
+        return self.search_view[2]
+
+    def count(self, conn, search=None):
+        return len(self.view(conn, "id", search))
+
+    def get(self, conn, ids):
+        # Current rows for these ids, skipping any that no longer exist
+        self.refresh(conn)
+        return [self.items[item_id].row() for item_id in ids if item_id in self.items]
+
+    def page(self, conn, sort="id", descending=False, after=None, before=None, limit=50, search=None):
+        # Keyset pagination: up to limit rows following the key `after`, or the
+        # rows just before the key `before`, in display order
+        self.sort_key(sort)  # validates sort before anything is loaded
+        view = self.view(conn, sort, search)
+        key = self.sort_key(sort)  # taken after view(), which may have reloaded the rows
+        backwards = before is not None
+        anchor = before if backwards else after
+        reverse = descending != backwards
+        if anchor is None:
+            ids = view[max(0, len(view) - limit):][::-1] if reverse else view[:limit]
+        elif reverse:
+            end = bisect.bisect_left(view, self.anchor_key(sort, anchor), key=key)
+            ids = view[max(0, end - limit):end][::-1]
+        else:
+            start = bisect.bisect_right(view, self.anchor_key(sort, anchor), key=key)
+            ids = view[start:start + limit]
+        rows = [self.items[item_id].row() for item_id in ids]
+        if backwards:
+            rows.reverse()
+        return rows
+
+    def at(self, conn, sort="id", descending=False, offset=0, limit=50, search=None):
+        # Positional fetch, only used when the scrollbar is dragged to an arbitrary point
+        self.sort_key(sort)  # validates sort before anything is loaded
+        view = self.view(conn, sort, search)
+        if descending:
+            end = max(0, len(view) - offset)
+            ids = view[max(0, end - limit):end][::-1]
+        else:
+            ids = view[offset:offset + limit]
+        return [self.items[item_id].row() for item_id in ids]
+
+    def drop(self, item_id):
+        item = self.items.get(item_id)
+        if item is None:
+            return
+        for sort, view in self.views.items():
+            key = self.sort_key(sort)
+            target = key(item_id) if key else item_id
+            del view[bisect.bisect_left(view, target, key=key)]
+        del self.items[item_id]
+        if self.by_name_price.get((item.name, item.price)) is item:
+            del self.by_name_price[(item.name, item.price)]
+        self.search_view = None
+
+    def put(self, row):
+        self.drop(row[0])
+        item = self.items[row[0]] = StockItem(*row)
+        self.by_name_price[(item.name, item.price)] = item
+        for sort, view in self.views.items():
+            bisect.insort(view, item.id, key=self.sort_key(sort))
+        self.search_view = None
+
+    def reload(self, conn, ids):
+        # Re-reads these rows after they were changed
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            found = {row[0]: row for row in conn.execute(
+                f"SELECT id, name, quantity, price FROM inventory WHERE id IN ({placeholders})", chunk)}
+            for item_id in chunk:
+                if item_id in found:
+                    self.put(found[item_id])
+                else:
+                    self.drop(item_id)
+
+    # Writes: SQLite first, then the same change applied here
+
+    def add_stock(self, conn, name, qty, price, cost=None):
+        self.refresh(conn)
+        try:
+            add_stock(conn, name, qty, price, cost)
+            conn.commit()
+        except Exception:
+            conn.rollback()  # e.g. database is locked: don't leave the transaction (and its lock) open
+            raise
+        item = self.by_name_price.get((name, price))
+        if item is not None:
+            self.reload(conn, [item.id])
+        else:
+            self.reload(conn, [row[0] for row in conn.execute(
+                "SELECT id FROM inventory WHERE name = ? AND price = ?", (name, price))])
+
+    def delete(self, conn, item_id):
+        self.refresh(conn)
+        try:
+            conn.execute("DELETE FROM inventory WHERE id=?", (item_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self.drop(item_id)
+
+    def checkout(self, conn, customer_name, lines, bill_date=None, busy_timeout=None):
+        self.refresh(conn)
+        result = checkout(conn, customer_name, lines, bill_date, busy_timeout=busy_timeout)
+        self.reload(conn, {item[4] for item in result[1]})
+        return result
+
+    def import_csv(self, conn, path):
+        result = import_stock_csv(conn, path)
+        # Picks up the imported rows from stock_changes, or reloads. A connection's
+        # own commits leave data_version alone, so refresh must not skip on it.
+        self.version = None
+        self.refresh(conn)
+        return result
+
+
+class LocalBackend:
+    # What the pages ask of the inventory, answered from the database file
+    # directly. RemoteBackend answers the same calls from an inventory server.
+    def __init__(self, conn=None, checkout_busy_timeout=None):
+        self.conn = conn  # None: the calling thread's connection to db
+        self.checkout_busy_timeout = checkout_busy_timeout  # ms, see checkout
+        self.catalog = StockCatalog()
+
+    def connection(self):
+        return self.conn if self.conn is not None else db.connection()
+
+    def data_version(self):
+        # Changes whenever another connection commits
+        return self.connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def login(self, username, password):
+        return self.connection().execute("SELECT 1 FROM users WHERE username=? AND password=?",
+                                         (username, password)).fetchone() is not None
+
+    def signup(self, username, password):
+        # False if the username is taken
+        conn = self.connection()
+        try:
+            conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password))
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
+        conn.commit()
+        return True
+
+    # Stock is read and written through the in-memory catalog
+
+    def count_stock(self, search=None):
+        return self.catalog.count(self.connection(), search)
+
+    def fetch_stock_page(self, sort="id", descending=False, after=None, before=None, limit=50, search=None):
+        return self.catalog.page(self.connection(), sort, descending, after, before, limit, search)
+
+    def fetch_stock_at(self, sort="id", descending=False, offset=0, limit=50, search=None):
+        return self.catalog.at(self.connection(), sort, descending, offset, limit, search)
+
+    def get_stock(self, ids):
+        return self.catalog.get(self.connection(), ids)
+
+    def add_stock(self, name, qty, price, cost=None):
+        self.catalog.add_stock(self.connection(), name, qty, price, cost)
+
+    def delete_stock(self, item_id):
+        self.catalog.delete(self.connection(), item_id)
+
+    def import_stock_csv(self, path):
+        return self.catalog.import_csv(self.connection(), path)
+
+    def checkout(self, customer_name, lines, bill_date=None):
+        return self.catalog.checkout(self.connection(), customer_name, lines, bill_date, self.checkout_busy_timeout)
+
+    def low_stock(self, limit=50):
+        return low_stock(self.connection(), limit)
+
+    def set_reorder_level(self, item_id, level):
+        # The trigger puts the item on or off the watchlist
+        if level < 0:
+            raise ValueError("The reorder level can't be negative")
+        conn = self.connection()
+        try:
+            conn.execute("UPDATE inventory SET reorder_level = ? WHERE id = ?", (level, item_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def bills(self, after_id=0, start=None, end=None):
+        # (id, date, customer, total, gst, final) of bills after after_id, optionally
+        # limited to the days start..end
+        conn = self.connection()
+        if start or end:
+            until = (datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d") if end else None
+            # "+id" keeps SQLite from walking the rowid instead of the date index
+            return conn.execute("""SELECT id, date, customer_name, total_price, gst, final_price
+                                   FROM bills WHERE date >= ? AND date < ? AND +id > ? ORDER BY id""",
+                                (start or "", until or "\uffff", after_id)).fetchall()
+        return conn.execute("""SELECT id, date, customer_name, total_price, gst, final_price
+                               FROM bills WHERE id > ? ORDER BY id""", (after_id,)).fetchall()
+
+    def day_bill_rows(self, day):
+        # Every line of every bill of one day (YYYY-MM-DD), bill by bill:
+        # (bill id, date, customer, total, gst, final, item, qty, price, line total)
+        start = datetime.strptime(day, "%Y-%m-%d")
+        end = start + timedelta(days=1)
+        return self.connection().execute("""
+            SELECT b.id, b.date, b.customer_name, b.total_price, b.gst, b.final_price,
+                   i.item_name, i.quantity, i.price, i.total_price
+            FROM bills b JOIN bill_items i ON i.bill_id = b.id
+            WHERE b.date >= ? AND b.date < ?
+            ORDER BY b.id, i.id""", (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+
+    def sales_summary(self, start=None, end=None):
+        return sales_summary(self.connection(), start, end)
+
+    def top_items(self, limit=5):
+        return top_items(self.connection(), limit)
+
+    def import_bill_history(self, path):
+        return import_bill_history(self.connection(), path)
+
+    def export_data(self, directory, fmt="csv", datasets=None, changes=False):
+        return export_data(self.connection(), directory, fmt, datasets, changes)
+
+
+backend = LocalBackend(checkout_busy_timeout=TILL_BUSY_TIMEOUT)  # the pages check out on the Tk thread
+
+
+class InventoryApp(tk.Tk):
+    WATCH_INTERVAL = 1000  # ms between checks for changes made by other terminals
+
+    def __init__(self, startup_report=False):
         super().__init__()
+        mark_startup("window created")
         self.title("Inventory System")
         self.geometry("600x500")
         self.resizable(False, False)
 
-        self.frames = {}
-        for F in (LoginPage, SignupPage, Dashboard, AddStockPage, ViewStockPage, SalesPage):
-            frame = F(self)
-            self.frames[F] = frame
-            frame.place(x=0, y=0, relwidth=1, relheight=1)
+        # Bill PDFs are rendered in the background
+        self.pdf_queue = PdfQueue()
+        self.pdf_queue.poll(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
 
+        # Pages are built the first time they are shown
+        self.frames = {}
+        self.current = None  # class of the page on top
         self.show_frame(LoginPage)
+        mark_startup("login page built")
+
+        # Other terminals' commits are picked up by polling the database
+        self.data_version = None
+        self.after(self.WATCH_INTERVAL, self.watch_changes)
+
+        if startup_report:
+            self.after_idle(self.report_startup)
 
     def show_frame(self, cont):
+        if cont not in self.frames:
+            frame = cont(self)
+            self.frames[cont] = frame
+            frame.place(x=0, y=0, relwidth=1, relheight=1)
+        elif hasattr(self.frames[cont], "on_show"):
+            self.frames[cont].on_show()
         self.frames[cont].tkraise()
+        self.current = cont
+
+    def watch_changes(self):
+        try:
+            self.check_for_changes()
+        except (sqlite3.Error, OSError):
+            pass  # e.g. the share or server is briefly unreachable; try again next time
+        self.after(self.WATCH_INTERVAL, self.watch_changes)
+
+    def check_for_changes(self):
+        # PRAGMA data_version moves whenever another connection commits, so built
+        # pages that show stored data refresh instead of acting on stale rows
+        version = backend.data_version()
+        if self.data_version is not None and version != self.data_version:
+            for frame in self.frames.values():
+                if hasattr(frame, "on_db_change"):
+                    frame.on_db_change()
+        self.data_version = version
+
+    def report_startup(self):
+        mark_startup("login screen shown")
+        report = startup_report()
+        if sys.stderr is not None:
+            print(report, file=sys.stderr)
+        else:
+            # Windowed exe: no console to print to
+            with open(os.path.join(base_dir, "startup_timing.txt"), mode="w") as file:
+                file.write(report + "\n")
+
+    def on_close(self):
+        # Let bills that are still rendering finish before exiting
+        if self.pdf_queue.pending:
+            self.title(f"Inventory System - finishing {self.pdf_queue.pending} bill PDF(s)...")
+            self.update_idletasks()
+            self.pdf_queue.wait()
+        self.destroy()
 
 
 class LoginPage(tk.Frame):
@@ -87,6 +1124,7 @@ class LoginPage(tk.Frame):
         tk.Button(self, text="Don't have an account? Sign up", font=("Arial", 10), fg="blue",
                   command=lambda: master.show_frame(SignupPage)).pack(pady=5)
 
+    @timed("login")
     def login(self):
         user = self.username_entry.get()
         pwd = self.password_entry.get()
@@ -96,8 +1134,13 @@ class LoginPage(tk.Frame):
             messagebox.showerror("Error", "Please enter both username and password!")
             return
 
-        cursor.execute("SELECT * FROM users WHERE username=? AND password=?", (user, pwd))
-        if cursor.fetchone():
+        try:
+            valid = backend.login(user, pwd)
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Cannot log in: {db_err}")
+            return
+
+        if valid:
             self.master.show_frame(Dashboard)  # Move to Dashboard if valid credentials
         else:
             messagebox.showerror("Error", "Invalid credentials")  # Show error if credentials are incorrect
@@ -136,24 +1179,282 @@ class SignupPage(tk.Frame):
             return
 
         try:
-            cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (user, pwd))
-            conn.commit()
+            created = backend.signup(user, pwd)
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Cannot sign up: {db_err}")
+            return
+
+        if created:
             messagebox.showinfo("Success", "Account created! Login now.")
             self.username_entry.delete(0, tk.END)
             self.password_entry.delete(0, tk.END)
             self.master.show_frame(LoginPage)
-        except sqlite3.IntegrityError:
+        else:
             messagebox.showerror("Error", "Username already exists")
             self.username_entry.delete(0, tk.END)
             self.password_entry.delete(0, tk.END)
 
 
+BILL_HISTORY_CHECK_BYTES = 4096
+
+
+def bill_history_fingerprint(path, offset):
+    # Hash of the first and the last few KB of the first offset bytes of path;
+    # if they differ from when the offset was stored, the file was rewritten
+    digest = hashlib.sha1()
+    with open(path, mode="rb") as file:
+        digest.update(file.read(min(offset, BILL_HISTORY_CHECK_BYTES)))
+        file.seek(max(0, offset - BILL_HISTORY_CHECK_BYTES))
+        digest.update(file.read(min(offset, BILL_HISTORY_CHECK_BYTES)))
+    return digest.hexdigest()
+
+
+def forget_bill_history(cur, source, chunk_bills=10000):
+    # Takes the bills imported from source back out of bills, bill_items and the
+    # rollups, inside the caller's transaction
+    bills = []
+    rows = cur.connection.execute("""
+        SELECT b.id, b.date, b.final_price, b.gst, i.item_name, i.quantity, i.price, i.total_price
+        FROM imported_bills s JOIN bills b ON b.id = s.bill_id LEFT JOIN bill_items i ON i.bill_id = b.id
+        WHERE s.source = ? ORDER BY b.id, i.id""", (source,))
+    for bill_id, bill_date, final_price, gst, *item in rows:
+        if not bills or bills[-1][0] != bill_id:
+            if len(bills) >= chunk_bills:
+                add_to_rollups(cur, [bill[1:] for bill in bills], sign=-1)
+                bills = []
+            bills.append((bill_id, bill_date, final_price, gst, []))
+        if item[0] is not None:
+            bills[-1][4].append(tuple(item))
+    add_to_rollups(cur, [bill[1:] for bill in bills], sign=-1)
+    cur.execute("DELETE FROM sales_daily WHERE bills = 0")
+    cur.execute("DELETE FROM sales_monthly WHERE bills = 0")
+    cur.execute("DELETE FROM sales_item WHERE quantity = 0")
+    cur.execute("DELETE FROM bill_items WHERE bill_id IN (SELECT bill_id FROM imported_bills WHERE source = ?)",
+                (source,))
+    cur.execute("DELETE FROM bills WHERE id IN (SELECT bill_id FROM imported_bills WHERE source = ?)", (source,))
+    cur.execute("DELETE FROM imported_bills WHERE source = ?", (source,))
+
+
+@timed("import bill history csv")
+def import_bill_history(conn, path, batch_rows=100000, block_size=4 * 1024 * 1024):
+    # Streams the legacy bill_history.csv into bills/bill_items. Consecutive rows
+    # sharing (date, customer) form one bill; gst and final price are bill level
+    # values repeated on every line. The byte offset reached is committed with
+    # each batch, together with a fingerprint of the bytes before it, so an
+    # interrupted import resumes and rows appended later by an older client are
+    # picked up on the next run. A file that was truncated or rewritten since
+    # has its earlier bills taken out and is read again from the start. Rows
+    # that can't be read are reported and skipped. Returns the number of rows read.
+    if not os.path.exists(path):
+        return 0
+
+    source = os.path.abspath(path)
+    offset_key = "bill_history_offset:" + source
+    check_key = "bill_history_check:" + source
+    legacy_key = "bill_history_offset:" + os.path.basename(path)  # before offsets were kept per full path
+    offset = get_meta(conn, offset_key)
+    check = get_meta(conn, check_key)
+    if offset is None:
+        offset, check = get_meta(conn, legacy_key), None
+    offset = int(offset or 0)
+    encoding = locale.getpreferredencoding(False)
+    cur = conn.cursor()
+    imported = skipped = 0
+
+    bill_key = None  # (date, customer) of the bill being collected
+    bill_lines = []
+    bill_gst = bill_final = 0.0
+    pending_bills = []
+    pending_rows = 0
+
+    def flush(new_offset, rebuild=False):
+        nonlocal pending_bills, pending_rows
+        cur.execute("BEGIN")
+        try:
+            if rebuild:
+                forget_bill_history(cur, source)
+            for (bill_date, customer_name), lines, gst, final_price in pending_bills:
+                total_price = sum(line[3] for line in lines)
+                bill_id = record_bill(cur, bill_date, customer_name, lines, total_price, gst, final_price,
+                                      rollup=False)
+                cur.execute("INSERT INTO imported_bills (bill_id, source) VALUES (?, ?)", (bill_id, source))
+            add_to_rollups(cur, [(bill_date, final_price, gst, lines)
+                                 for (bill_date, _), lines, gst, final_price in pending_bills])
+            set_meta(cur, offset_key, new_offset)
+            set_meta(cur, check_key, bill_history_fingerprint(path, new_offset))
+            cur.execute("DELETE FROM meta WHERE key = ?", (legacy_key,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        pending_bills = []
+        pending_rows = 0
+
+    with open(path, mode="rb") as file:
+        size = file.seek(0, os.SEEK_END)
+        if offset:
+            if offset > size:
+                unchanged = False
+            elif check is not None:
+                unchanged = bill_history_fingerprint(path, offset) == check
+            else:
+                file.seek(offset - 1)
+                unchanged = file.read(1) == b"\n"  # all an offset stored without a fingerprint can tell
+            if not unchanged:
+                flush(0, rebuild=True)
+                offset = 0
+        if size <= offset:
+            return 0
+        file.seek(offset)
+        position = offset
+        leftover = b""
+        while True:
+            block = file.read(block_size)
+            data = leftover + block
+            cut = data.rfind(b"\n") + 1
+            if not block:
+                cut = 0  # a trailing line without a newline may still be being written
+            leftover = data[cut:]
+            if cut == 0:
+                break
+
+            lines = data[:cut].split(b"\n")[:-1]
+            rows = csv.reader(line.decode(encoding, errors="replace") for line in lines)
+            for raw, row in zip(lines, rows):
+                line_start = position
+                position += len(raw) + 1
+                if line_start == 0 or not row:
+                    continue  # header or blank line
+
+                try:
+                    bill_date, customer_name, item_name, quantity, price, total_price, gst, final_price = row
+                    line = (item_name, int(quantity), float(price), float(total_price))
+                    gst, final_price = float(gst), float(final_price)
+                except ValueError as e:
+                    skipped += 1
+                    print(f"{os.path.basename(path)}: skipped the row at byte {line_start}: {e}", file=sys.stderr)
+                    continue
+                key = (bill_date, customer_name)
+                if key != bill_key:
+                    if bill_lines:
+                        pending_bills.append((bill_key, bill_lines, bill_gst, bill_final))
+                        pending_rows += len(bill_lines)
+                        if pending_rows >= batch_rows:
+                            flush(line_start)
+                    bill_key, bill_lines = key, []
+                    bill_gst, bill_final = gst, final_price
+                bill_lines.append(line)
+                imported += 1
+
+    if bill_lines:
+        pending_bills.append((bill_key, bill_lines, bill_gst, bill_final))
+    if pending_bills or position != offset:
+        flush(position)
+    if skipped:
+        print(f"{os.path.basename(path)}: skipped {skipped} rows that could not be read", file=sys.stderr)
+    return imported
+
+
+def sales_summary(conn, start=None, end=None):
+    # (bills, total sales, GST, cost of goods sold) for the days start..end (YYYY-MM-DD,
+    # inclusive, None for open ended), read from the rollups: whole months come
+    # from sales_monthly and only the partial months at either end from
+    # sales_daily, so the cost doesn't grow with the length of the history
+    first = datetime.strptime(start, "%Y-%m-%d") if start else None
+    last = datetime.strptime(end, "%Y-%m-%d") if end else None
+    months_from = first
+    if first is not None and first.day != 1:
+        months_from = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    months_until = None if last is None else (last + timedelta(days=1)).replace(day=1)  # exclusive
+
+    parts = []
+    if months_from is not None and months_until is not None and months_from >= months_until:
+        parts.append(("sales_daily", "day", start, end))
+    else:
+        parts.append(("sales_monthly", "month", months_from and months_from.strftime("%Y-%m"),
+                      months_until and (months_until - timedelta(days=1)).strftime("%Y-%m")))
+        if first is not None and first != months_from:
+            parts.append(("sales_daily", "day", start, (months_from - timedelta(days=1)).strftime("%Y-%m-%d")))
+        if last is not None and months_until <= last:
+            parts.append(("sales_daily", "day", months_until.strftime("%Y-%m-%d"), end))
+
+    bills, total_sales, total_gst, total_cost = 0, 0.0, 0.0, 0.0
+    for table, key, low, high in parts:
+        row = conn.execute(f"""SELECT COALESCE(SUM(bills), 0), COALESCE(SUM(sales), 0), COALESCE(SUM(gst), 0),
+                                      COALESCE(SUM(cost), 0)
+                               FROM {table} WHERE {key} >= ? AND {key} <= ?""",
+                           (low or "", high or "\uffff")).fetchone()
+        bills += row[0]
+        total_sales += row[1]
+        total_gst += row[2]
+        total_cost += row[3]
+    return bills, total_sales, total_gst, total_cost
+
+
+def top_items(conn, limit=5):
+    # Best selling items of all time by quantity, from the sales_item rollup
+    return conn.execute("SELECT item_name, quantity, sales FROM sales_item ORDER BY quantity DESC LIMIT ?",
+                        (limit,)).fetchall()
+
+
+class TreeSync:
+    # Keeps a Treeview in step with rows keyed by an id (inventory id, bill id).
+    # Only rows that differ from what is shown are inserted, updated, moved or
+    # deleted; iids are derived from the key so selection and scroll survive.
+    def __init__(self, tree):
+        self.tree = tree
+        self.shown = {}  # Key = row id, Value = values currently displayed
+
+    @timed("treeview sync")
+    def sync(self, rows):
+        # Make the tree show exactly these (key, values) rows, in this order
+        wanted = dict(rows)
+        self.remove([key for key in self.shown if key not in wanted])
+        self.upsert(rows)
+        order = [str(key) for key in wanted]
+        if list(self.tree.get_children()) != order:
+            self.tree.set_children("", *order)
+
+    @timed("treeview upsert")
+    def upsert(self, rows):
+        # Append new (key, values) rows and update changed ones in place
+        for key, values in rows:
+            values = tuple(values)
+            current = self.shown.get(key)
+            if current is None:
+                self.tree.insert("", "end", iid=str(key), values=values)
+            elif current != values:
+                self.tree.item(str(key), values=values)
+            self.shown[key] = values
+
+    @timed("treeview remove")
+    def remove(self, keys):
+        iids = [str(key) for key in keys if self.shown.pop(key, None) is not None]
+        if iids:
+            self.tree.delete(*iids)
+
+
 class SalesPage(tk.Frame):
     def __init__(self, master):
         super().__init__(master)
 
         # Add a label to show the page title
-        tk.Label(self, text="Sales History", font=("Arial", 20)).pack(pady=30)
+        tk.Label(self, text="Sales History", font=("Arial", 20)).pack(pady=10)
+
+        # Date range (YYYY-MM-DD, either may be left empty) for the bills and totals shown
+        range_frame = tk.Frame(self)
+        range_frame.pack()
+        tk.Label(range_frame, text="From:").pack(side="left")
+        self.from_entry = tk.Entry(range_frame, width=12)
+        self.from_entry.pack(side="left", padx=5)
+        tk.Label(range_frame, text="To:").pack(side="left")
+        self.to_entry = tk.Entry(range_frame, width=12)
+        self.to_entry.pack(side="left", padx=5)
+        self.to_entry.bind("<Return>", lambda event: self.apply_range())
+        tk.Button(range_frame, text="Show", command=self.apply_range).pack(side="left", padx=5)
+        tk.Button(range_frame, text="This Month", command=self.show_this_month).pack(side="left", padx=5)
+        tk.Button(range_frame, text="All", command=self.show_all).pack(side="left", padx=5)
+        self.date_range = (None, None)
 
         # Create a frame to hold the Treeview and scrollbar
         tree_frame = tk.Frame(self)
@@ -176,6 +1477,7 @@ class SalesPage(tk.Frame):
 
         # Pack Treeview
         self.tree.pack(pady=10, fill="both", expand=True, padx=20)
+        self.bills = TreeSync(self.tree)
 
         # Add horizontal scrollbar
         scroll_x = tk.Scrollbar(tree_frame, orient="horizontal", command=self.tree.xview)
@@ -199,6 +1501,12 @@ class SalesPage(tk.Frame):
         self.loss_label = tk.Label(self.sales_info_frame, text="Loss: Rs. 0.00", font=("Arial", 12))
         self.loss_label.grid(row=3, column=0, padx=20, sticky="w")
 
+        self.bill_count_label = tk.Label(self.sales_info_frame, text="Bills: 0", font=("Arial", 12))
+        self.bill_count_label.grid(row=0, column=1, padx=20, sticky="w")
+
+        self.top_item_label = tk.Label(self.sales_info_frame, text="Best Seller: -", font=("Arial", 12))
+        self.top_item_label.grid(row=1, column=1, padx=20, sticky="w")
+
         # Frame for buttons, ensuring they are placed correctly
         button_frame = tk.Frame(self)
         button_frame.pack(pady=10)
@@ -211,64 +1519,44 @@ class SalesPage(tk.Frame):
         refresh_button = tk.Button(button_frame, text="Refresh Sales History", command=self.refresh_bill_history)
         refresh_button.pack(side="left", padx=10)
 
+        # Day Book Button to print all bills of one day into a single PDF
+        day_book_button = tk.Button(button_frame, text="Day Book PDF", command=self.print_day_book)
+        day_book_button.pack(side="left", padx=10)
+
+        # One-shot move of the legacy CSV history into the bills tables, done
+        # the first time sales are looked at rather than at startup
+        try:
+            backend.import_bill_history(bill_history_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to import bill history.\n{str(e)}")
+
         # Load the initial bill history
+        self.last_bill_id = 0
         self.load_bill_history()
 
+    @timed("load_bill_history")
     def load_bill_history(self):
         try:
-            # Clear existing entries in the treeview
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-
-            # Sales summary vars
-            total_sales = 0
-            total_cost = 0
-
-            csv_filename = "bill_history.csv"
-            if not os.path.exists(csv_filename):
-                with open(csv_filename, mode='w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["Date", "Customer Name", "Item", "Qty", "Price", "Total", "GST", "Final Total"])
-
-            # Load and group bills
-            bill_dict = {}  # Key = (Date, Customer, Final Total), Value = summary dict
-
-            with open(csv_filename, mode="r") as file:
-                reader = csv.reader(file)
-                next(reader)
-                for row in reader:
-                    bill_date, customer_name, item_name, quantity, price, total_price, gst, final_price = row
-                    key = (bill_date, customer_name)
-                    if key not in bill_dict:
-                        bill_dict[key] = {
-                            "total_price": float(total_price),
-                            "gst": float(gst),
-                            "final_price": float(final_price),
-                            "cost": float(price) * int(quantity)
-                        }
-                    else:
-                        bill_dict[key]["total_price"] += float(total_price)
-                        bill_dict[key]["gst"] += float(gst)
-                        bill_dict[key]["final_price"] += float(final_price)
-                        bill_dict[key]["cost"] += float(price) * int(quantity)
-
-            # Populate the table and calculate totals
-            for (bill_date, customer_name), values in bill_dict.items():
-                self.tree.insert(
-                    "", "end",
-                    values=(
-                        bill_date,
-                        customer_name,
-                        f"{values['total_price']:.2f}",
-                        f"{values['gst']:.2f}",
-                        f"{values['final_price']:.2f}"
-                    )
-                )
-                total_sales += values['final_price']
-                total_cost += values['cost']
-
-            # Calculate profit/loss
-            net = total_sales - total_cost
+            # Bills are append-only, so only those newer than the last one shown are fetched
+            start, end = self.date_range
+            bills = backend.bills(self.last_bill_id, start, end)
+            rows = []
+            for bill_id, bill_date, customer_name, total_price, gst, final_price in bills:
+                rows.append((bill_id, (
+                    bill_date,
+                    customer_name,
+                    f"{total_price:.2f}",
+                    f"{gst:.2f}",
+                    f"{final_price:.2f}"
+                )))
+                self.last_bill_id = bill_id
+            self.bills.upsert(rows)
+
+            # Totals come from the daily/monthly rollups
+            bill_count, total_sales, total_gst, total_cost = backend.sales_summary(start, end)
+
+            # Profit/loss against the FIFO cost of what was sold; GST is passed on, not earned
+            net = total_sales - total_gst - total_cost
             profit = net if net >= 0 else 0
             loss = -net if net < 0 else 0
 
@@ -277,21 +1565,81 @@ class SalesPage(tk.Frame):
             self.total_cost_label.config(text=f"Total Cost: Rs. {total_cost:.2f}")
             self.profit_label.config(text=f"Profit: Rs. {profit:.2f}")
             self.loss_label.config(text=f"Loss: Rs. {loss:.2f}")
+            self.bill_count_label.config(text=f"Bills: {bill_count}")
+            best = backend.top_items(1)
+            self.top_item_label.config(text=f"Best Seller: {best[0][0]} ({best[0][1]})" if best else "Best Seller: -")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load sales history.\n{str(e)}")
 
+    def on_db_change(self):
+        self.load_bill_history()
+
+    def apply_range(self):
+        start = self.from_entry.get().strip() or None
+        end = self.to_entry.get().strip() or None
+        try:
+            for day in (start, end):
+                if day:
+                    datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter dates as YYYY-MM-DD!")
+            return
+        if start and end and start > end:
+            messagebox.showerror("Error", "The From date must not be after the To date!")
+            return
+        self.set_range(start, end)
+
+    def show_this_month(self):
+        today = datetime.now()
+        self.set_range(today.strftime("%Y-%m-01"), today.strftime("%Y-%m-%d"))
+
+    def show_all(self):
+        self.set_range(None, None)
+
+    def set_range(self, start, end):
+        for entry, day in ((self.from_entry, start), (self.to_entry, end)):
+            entry.delete(0, tk.END)
+            entry.insert(0, day or "")
+        self.date_range = (start, end)
+        # Start over with the bills of the new range
+        self.bills.sync([])
+        self.last_bill_id = 0
+        self.load_bill_history()
+
+    def print_day_book(self):
+        day = simpledialog.askstring("Day Book", "Print all bills of day (YYYY-MM-DD):",
+                                     initialvalue=datetime.now().strftime("%Y-%m-%d"))
+        if not day:
+            return
+        try:
+            datetime.strptime(day, "%Y-%m-%d")
+        except ValueError:
+            messagebox.showerror("Error", "Please enter the day as YYYY-MM-DD!")
+            return
+
+        def done(filename, error):
+            if error is None:
+                messagebox.showinfo("Success", f"Day book saved to {filename}")
+            else:
+                messagebox.showerror("Error", f"Failed to create day book.\n{str(error)}")
+
+        filename = f"daybook_{day}.pdf"
+        self.master.pdf_queue.submit(create_invoice_book, day, filename, filename=filename, on_done=done)
+
     def refresh_bill_history(self):
         # Call load_bill_history to refresh the data
         self.load_bill_history()
 
 class Dashboard(tk.Frame):
+    WATCHLIST_SIZE = 100  # low stock rows shown; the count covers them all
+
     def __init__(self, master):
         super().__init__(master)
         tk.Label(self, text="Dashboard", font=("Arial", 20)).pack(pady=30)
 
         btn_frame = tk.Frame(self)
-        btn_frame.pack(pady=20)
+        btn_frame.pack(side="left", anchor="n", padx=20)
 
         tk.Button(btn_frame, text="Add Stock", width=20, height=2,
                   command=lambda: master.show_frame(AddStockPage)).pack(pady=5)
@@ -305,10 +1653,300 @@ class Dashboard(tk.Frame):
                                              command=lambda: master.show_frame(SalesPage))
         self.bill_history_button.pack(pady=5)
 
+        # Export inventory and sales for the accounts
+        tk.Button(btn_frame, text="Export Data", width=20, height=2, command=self.export_data).pack(pady=5)
+
         # Logout Button (Moved to below Sales History)
         tk.Button(btn_frame, text="Logout", width=20, height=2, command=lambda: master.show_frame(LoginPage)).pack(
             pady=5)
 
+        # Low stock watchlist beside the buttons: a live count and the emptiest items
+        watch_frame = tk.Frame(self)
+        watch_frame.pack(side="left", anchor="n", fill="both", expand=True, padx=(0, 20))
+        self.low_stock_label = tk.Label(watch_frame, text="Low stock: 0", font=("Arial", 12, "bold"))
+        self.low_stock_label.pack(anchor="w")
+        list_frame = tk.Frame(watch_frame)
+        list_frame.pack(fill="both", expand=True, pady=5)
+        self.watchlist = ttk.Treeview(list_frame, columns=("Name", "Qty", "Reorder"), show="headings", height=12)
+        self.watchlist.heading("Name", text="Item")
+        self.watchlist.heading("Qty", text="Qty")
+        self.watchlist.heading("Reorder", text="Reorder at")
+        self.watchlist.column("Name", width=170)
+        self.watchlist.column("Qty", width=50, anchor="e")
+        self.watchlist.column("Reorder", width=80, anchor="e")
+        scroll_y = ttk.Scrollbar(list_frame, orient="vertical", command=self.watchlist.yview)
+        scroll_y.pack(side="right", fill="y")
+        self.watchlist.pack(side="left", fill="both", expand=True)
+        self.watchlist.configure(yscrollcommand=scroll_y.set)
+        self.low_items = TreeSync(self.watchlist)
+        tk.Button(watch_frame, text="Set Reorder Level", command=self.set_reorder_level).pack(anchor="e")
+        self.load_watchlist()
+
+        # Hidden diagnostics page, Ctrl+Shift+D from any page once logged in. The
+        # binding is on the window, as frames don't get keyboard focus.
+        master.bind("<Control-D>", lambda event: self.show_diagnostics())
+
+    @timed("load_watchlist")
+    def load_watchlist(self):
+        try:
+            count, rows = backend.low_stock(self.WATCHLIST_SIZE)
+        except sqlite3.DatabaseError:
+            return  # the watcher tries again on the next change
+        more = f" (showing {len(rows)})" if count > len(rows) else ""
+        self.low_stock_label.config(text=f"Low stock: {count}{more}",
+                                    fg="red" if count else "black")
+        self.low_items.sync([(item_id, (name, qty, level)) for item_id, name, qty, level in rows])
+
+    def on_show(self):
+        self.load_watchlist()
+
+    def on_db_change(self):
+        self.load_watchlist()
+
+    def set_reorder_level(self):
+        selected = self.watchlist.selection()
+        if not selected:
+            messagebox.showerror("Error", "Please select an item on the low stock list.")
+            return
+        item_id = int(selected[0])
+        name, _, level = self.low_items.shown[item_id]
+        if ask_reorder_level(self, item_id, name, level):
+            self.load_watchlist()
+
+    def show_diagnostics(self):
+        opened_from = self.master.current
+        if opened_from in (LoginPage, SignupPage, DiagnosticsPage):
+            return  # logged out (the binding outlives logout), or already there
+        self.master.show_frame(DiagnosticsPage)
+        diagnostics = self.master.frames[DiagnosticsPage]
+        diagnostics.opened_from = opened_from
+        diagnostics.refresh()
+
+    def export_data(self):
+        directory = filedialog.askdirectory(title="Export to folder")
+        if not directory:
+            return
+        fmt = simpledialog.askstring("Export", "Format (" + ", ".join(EXPORT_FORMATS) + "):",
+                                     initialvalue="csv", parent=self)
+        if not fmt:
+            return
+        fmt = fmt.strip().lower()
+        if fmt not in EXPORT_FORMATS:
+            messagebox.showerror("Error", "Please choose one of: " + ", ".join(EXPORT_FORMATS))
+            return
+        changes = messagebox.askyesno("Export", "Only export what changed since the last export in this format?")
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            written = backend.export_data(directory, fmt, changes=changes)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to export.\n{str(e)}")
+            return
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Database error: {db_err}")
+            return
+        finally:
+            self.config(cursor="")
+        messagebox.showinfo("Success", describe_export(written))
+
+
+class DiagnosticsPage(tk.Frame):
+    COLUMNS = ("Operation", "Count", "Mean", "p50", "p95", "p99", "Max")
+
+    def __init__(self, master):
+        super().__init__(master)
+        tk.Label(self, text="Diagnostics", font=("Arial", 20)).pack(pady=10)
+        tk.Label(self, text="Times in milliseconds since the app started").pack()
+
+        tree_frame = tk.Frame(self)
+        tree_frame.pack(pady=10, fill="both", expand=True, padx=10)
+        self.tree = ttk.Treeview(tree_frame, columns=self.COLUMNS, show="headings")
+        for column in self.COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=60, anchor="e")
+        self.tree.column("Operation", width=200, anchor="w")
+        scroll_y = tk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        scroll_y.pack(side="right", fill="y")
+        self.tree.configure(yscrollcommand=scroll_y.set)
+        self.tree.pack(fill="both", expand=True)
+        self.rows = TreeSync(self.tree)
+
+        btn_frame = tk.Frame(self)
+        btn_frame.pack(pady=10)
+        tk.Button(btn_frame, text="Refresh", command=self.refresh).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Reset", command=self.reset).pack(side="left", padx=5)
+        self.profile_button = tk.Button(btn_frame, text="Start Profiling", command=self.toggle_profile)
+        self.profile_button.pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Export...", command=self.export).pack(side="left", padx=5)
+        tk.Button(btn_frame, text="Back", command=lambda: master.show_frame(self.opened_from)).pack(
+            side="left", padx=5)
+        self.opened_from = Dashboard  # the page Back returns to, set by Dashboard.show_diagnostics
+
+    def refresh(self):
+        self.rows.sync([(name, (name, count, *(f"{value:.2f}" for value in times)))
+                        for name, count, *times in perf_stats.rows()])
+
+    def reset(self):
+        perf_stats.reset()
+        self.refresh()
+
+    def toggle_profile(self):
+        profiling = perf_stats.toggle_profile()
+        self.profile_button.config(text="Stop Profiling" if profiling else "Start Profiling")
+        if not profiling:
+            messagebox.showinfo("Profiling", "Profile captured; it is included in the export.")
+
+    def export(self):
+        filename = filedialog.asksaveasfilename(title="Export diagnostics", initialfile="diagnostics.txt",
+                                                defaultextension=".txt",
+                                                filetypes=[("Text files", "*.txt"), ("JSON files", "*.json")])
+        if not filename:
+            return
+        try:
+            with open(filename, mode="w") as file:
+                if filename.lower().endswith(".json"):
+                    json.dump({
+                        "stats": [dict(zip(("operation", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"),
+                                           row)) for row in perf_stats.rows()],
+                        "startup": startup_marks,
+                        "profile": perf_stats.profile_text,
+                    }, file, indent=2)
+                else:
+                    file.write(perf_stats.report() + "\n\nStartup:\n" + startup_report() + "\n")
+                    if perf_stats.profile_text:
+                        file.write("\nProfile:\n" + perf_stats.profile_text)
+            messagebox.showinfo("Success", f"Diagnostics saved to {filename}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to export diagnostics.\n{str(e)}")
+
+# Header names accepted by the stock importer, e.g. inventory.csv's "Product Name,Price,Quantity"
+STOCK_CSV_COLUMNS = {
+    "name": ("product name", "item name", "name"),
+    "price": ("price",),
+    "quantity": ("quantity", "qty"),
+}
+# Optional unit cost of the units received; without it they are costed at their price
+STOCK_CSV_COST_COLUMNS = ("cost price", "unit cost", "cost")
+MAX_IMPORT_ERRORS = 1000
+
+
+def read_stock_csv(path, chunk_rows, errors):
+    # Yields lists of up to chunk_rows valid (name, quantity, price, cost) rows. Bad rows
+    # are recorded in errors["rows"] as (line number, message) and skipped.
+    with open(path, mode="r", newline="", encoding="utf-8-sig") as file:
+        reader = csv.reader(file)
+        header = [column.strip().lower() for column in next(reader, [])]
+        positions = {}
+        for field, names in STOCK_CSV_COLUMNS.items():
+            found = [header.index(name) for name in names if name in header]
+            if not found:
+                raise ValueError(f"{os.path.basename(path)} has no {field} column")
+            positions[field] = found[0]
+        name_at, price_at, qty_at = positions["name"], positions["price"], positions["quantity"]
+        cost_at = next((header.index(name) for name in STOCK_CSV_COST_COLUMNS if name in header), None)
+        width = max(positions.values()) + 1
+
+        chunk = []
+        for row in reader:
+            if not row:
+                continue
+            try:
+                if len(row) < width:
+                    raise ValueError("missing columns")
+                name = row[name_at].strip()
+                if not name:
+                    raise ValueError("empty product name")
+                qty = int(row[qty_at])
+                price = float(row[price_at])
+                cost = price
+                if cost_at is not None and cost_at < len(row) and row[cost_at].strip():
+                    cost = float(row[cost_at])
+                if not math.isfinite(price) or not math.isfinite(cost):
+                    raise ValueError("price or cost is not a number")
+                if qty < 0 or price < 0 or cost < 0:
+                    raise ValueError("negative quantity, price or cost")
+            except ValueError as e:
+                errors["count"] += 1
+                if len(errors["rows"]) < MAX_IMPORT_ERRORS:
+                    errors["rows"].append((reader.line_num, str(e)))
+                continue
+            chunk.append((name, qty, price, qty * cost))
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def check_stock_entry(qty, price, cost=None):
+    # Stock is only ever added in whole positive units at a non-negative price and cost
+    if qty <= 0:
+        raise ValueError("Quantity must be a positive whole number")
+    if not math.isfinite(price) or (cost is not None and not math.isfinite(cost)):
+        raise ValueError("Price and cost must be numbers")
+    if price < 0 or (cost is not None and cost < 0):
+        raise ValueError("Price and cost can't be negative")
+
+
+def add_stock(cur, name, qty, price, cost=None):
+    # Adds to the (name, price) row, creating it if needed, in one atomic statement,
+    # and books the units as a lot at their unit cost (the price if not given)
+    check_stock_entry(qty, price, cost)
+    cur.execute("""INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)
+                   ON CONFLICT (name, price) DO UPDATE SET quantity = quantity + excluded.quantity""",
+                (name, qty, price))
+    item_id = cur.execute("SELECT id FROM inventory WHERE name = ? AND price = ?", (name, price)).fetchone()[0]
+    receive_lot(cur, item_id, qty, price if cost is None else cost)
+
+
+@timed("import stock csv")
+def import_stock_csv(conn, path, chunk_rows=50000):
+    # Streams a stock CSV into inventory in one transaction, adding quantities to
+    # existing (name, price) rows like add_item does. Returns a dict with the
+    # number of rows merged and the rows that were rejected.
+    errors = {"count": 0, "rows": []}
+    merged = 0
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    try:
+        # Stage the file with duplicates folded together, then merge it in one ordered UPSERT.
+        # Each staged row becomes one lot, costed at the average of its duplicates.
+        cur.execute("DROP TABLE IF EXISTS temp.stock_import")
+        cur.execute("""CREATE TEMP TABLE stock_import (
+            name TEXT, price REAL, quantity INTEGER, total_cost REAL, PRIMARY KEY (name, price)) WITHOUT ROWID""")
+        for chunk in read_stock_csv(path, chunk_rows, errors):
+            cur.executemany("""INSERT INTO stock_import (name, quantity, price, total_cost) VALUES (?, ?, ?, ?)
+                               ON CONFLICT (name, price) DO UPDATE SET quantity = quantity + excluded.quantity,
+                                   total_cost = total_cost + excluded.total_cost""",
+                            chunk)
+            merged += len(chunk)
+
+        cur.execute("""INSERT INTO inventory (name, quantity, price)
+                       SELECT name, quantity, price FROM stock_import WHERE true ORDER BY name, price
+                       ON CONFLICT (name, price) DO UPDATE SET quantity = quantity + excluded.quantity""")
+        cur.execute("""INSERT INTO stock_lots (inventory_id, received_at, unit_cost, quantity, qty_remaining)
+                       SELECT i.id, ?, s.total_cost / s.quantity, s.quantity, s.quantity
+                       FROM stock_import s JOIN inventory i ON i.name = s.name AND i.price = s.price
+                       WHERE s.quantity > 0 ORDER BY i.id""",
+                    (datetime.now().strftime("%Y-%m-%d %H:%M:%S"),))
+        cur.execute("DROP TABLE temp.stock_import")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return {"merged": merged, "errors": errors["count"], "error_rows": errors["rows"]}
+
+
+def describe_stock_import(result, limit=10):
+    lines = [f"{result['merged']} rows imported, {result['errors']} rejected."]
+    for line_num, message in result["error_rows"][:limit]:
+        lines.append(f"Line {line_num}: {message}")
+    if result["errors"] > limit:
+        lines.append(f"... and {result['errors'] - limit} more")
+    return "\n".join(lines)
+
+
 class AddStockPage(tk.Frame):
     def __init__(self, master):
         super().__init__(master)
@@ -329,14 +1967,45 @@ class AddStockPage(tk.Frame):
         self.price_entry = tk.Entry(form, font=("Arial", 12), width=25)
         self.price_entry.grid(row=2, column=1)
 
+        # What the units cost to buy in; left empty they are costed at their price
+        tk.Label(form, text="Cost ₹ (optional):", font=("Arial", 12)).grid(row=3, column=0, pady=10, sticky='e')
+        self.cost_entry = tk.Entry(form, font=("Arial", 12), width=25)
+        self.cost_entry.grid(row=3, column=1)
+
         tk.Button(self, text="Add", font=("Arial", 12), command=self.add_item).pack(pady=10)
+        tk.Button(self, text="Import CSV...", font=("Arial", 10), command=self.import_csv).pack(pady=5)
         tk.Button(self, text="Back to Dashboard", font=("Arial", 10),
                   command=lambda: master.show_frame(Dashboard)).pack(pady=5)
 
+    def import_csv(self):
+        path = filedialog.askopenfilename(title="Import stock", filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        self.config(cursor="watch")
+        self.update_idletasks()
+        try:
+            result = backend.import_stock_csv(path)
+        except (OSError, ValueError, csv.Error) as e:
+            messagebox.showerror("Error", f"Failed to import {os.path.basename(path)}.\n{str(e)}")
+            return
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Database error: {db_err}")
+            return
+        finally:
+            self.config(cursor="")
+
+        if result["errors"]:
+            messagebox.showwarning("Import finished", describe_stock_import(result))
+        else:
+            messagebox.showinfo("Success", describe_stock_import(result))
+
+    @timed("add_item")
     def add_item(self):
         name = self.name_entry.get().strip()
         qty = self.qty_entry.get().strip()
         price = self.price_entry.get().strip()
+        cost = self.cost_entry.get().strip()
 
         if not name or not qty or not price:
             messagebox.showerror("Error", "All fields are required!")
@@ -345,30 +2014,26 @@ class AddStockPage(tk.Frame):
         try:
             qty = int(qty)
             price = float(price)
+            cost = float(cost) if cost else None
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numeric values for quantity, price and cost!")
+            return
 
-            # Check if item already exists with the same name and price
-            cursor.execute("SELECT quantity FROM inventory WHERE name = ? AND price = ?", (name, price))
-            result = cursor.fetchone()
-
-            if result:
-                # If item exists, update quantity
-                existing_qty = result[0]
-                new_qty = existing_qty + qty
-                cursor.execute("UPDATE inventory SET quantity = ? WHERE name = ? AND price = ?", (new_qty, name, price))
-            else:
-                # If item doesn't exist, insert new
-                cursor.execute("INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)", (name, qty, price))
+        try:
+            check_stock_entry(qty, price, cost)
 
-            conn.commit()
+            # Insert the item, or add to its quantity if the same name and price exists
+            backend.add_stock(name, qty, price, cost)
             messagebox.showinfo("Success", "Item added/updated!")
 
             # Clear input fields
             self.name_entry.delete(0, tk.END)
             self.qty_entry.delete(0, tk.END)
             self.price_entry.delete(0, tk.END)
+            self.cost_entry.delete(0, tk.END)
 
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numeric values for quantity and price!")
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
 
         except sqlite3.DatabaseError as db_err:
             messagebox.showerror("Database Error", f"Database error: {db_err}")
@@ -376,18 +2041,102 @@ class AddStockPage(tk.Frame):
         except Exception as e:
             messagebox.showerror("Error", f"Unexpected error: {e}")
 
+# Columns the stock grid can be sorted by, with their position in a stock row
+STOCK_SORT_COLUMNS = {"id": 0, "name": 1, "quantity": 2, "price": 3}
+
+
+def stock_key(row, sort):
+    # Keyset position of a stock row: (sort value, id)
+    return row[STOCK_SORT_COLUMNS[sort]], row[0]
+
+
+def stock_search_filter(conn, text):
+    # SQL condition and parameters restricting inventory to names matching text
+    mode = get_meta(conn, "stock_search", "none")
+    if mode == "trigram" and len(text) >= 3:
+        return "id IN (SELECT rowid FROM inventory_fts WHERE inventory_fts MATCH ?)", ('"' + text.replace('"', '""') + '"',)
+    if mode == "unicode61":
+        words = [word.replace('"', '""') for word in text.split()]
+        return ("id IN (SELECT rowid FROM inventory_fts WHERE inventory_fts MATCH ?)",
+                (" ".join(f'"{word}"*' for word in words),))
+    # Too short for trigrams, or no FTS5 at all: name prefix ranges over
+    # idx_inventory_name, in the spellings names are usually typed in
+    prefixes = list(dict.fromkeys((text, text.lower(), text.capitalize(), text.upper())))
+    condition = " OR ".join(["(name >= ? AND name < ?)"] * len(prefixes))
+    params = tuple(value for prefix in prefixes for value in (prefix, prefix + "\U0010ffff"))
+    return f"({condition})", params
+
+
+def low_stock(conn, limit=50):
+    # (number of low items, the first limit of them as (id, name, quantity,
+    # reorder level), emptiest first); both come from idx_inventory_low_stock
+    count = conn.execute("SELECT COUNT(*) FROM inventory WHERE low_stock = 1").fetchone()[0]
+    rows = conn.execute("""SELECT id, name, quantity, reorder_level FROM inventory
+                           WHERE low_stock = 1 ORDER BY quantity, id LIMIT ?""", (limit,)).fetchall()
+    return count, rows
+
+
+def ask_reorder_level(parent, item_id, name, current=None):
+    # Prompts for an item's reorder level and saves it; True if it was changed
+    level = simpledialog.askinteger("Reorder Level", f"Reorder {name} when its quantity falls to:",
+                                    initialvalue=current, minvalue=0, parent=parent)
+    if level is None:
+        return False
+    try:
+        backend.set_reorder_level(item_id, level)
+    except sqlite3.DatabaseError as db_err:
+        messagebox.showerror("Database Error", f"Database error: {db_err}")
+        return False
+    return True
+
+
 class ViewStockPage(tk.Frame):
+    # Rows shown at once, and extra rows kept fetched on each side while scrolling
+    PAGE_SIZE = 10
+    BUFFER = 40
+
     def __init__(self, master):
         super().__init__(master)
-        tk.Label(self, text="Stock View", font=("Arial", 20)).pack(pady=30)
-
-        # Create treeview to show the inventory
-        self.tree = ttk.Treeview(self, columns=("ID", "Name", "Qty", "Price"), show="headings", height=10)
-        self.tree.heading("ID", text="ID")
-        self.tree.heading("Name", text="Name")
-        self.tree.heading("Qty", text="Quantity")
-        self.tree.heading("Price", text="Price ₹")
-        self.tree.pack(pady=10, fill="x", padx=20)
+        tk.Label(self, text="Stock View", font=("Arial", 20)).pack(pady=(30, 10))
+
+        # Search box; the list is filtered shortly after the user stops typing
+        search_frame = tk.Frame(self)
+        search_frame.pack(fill="x", padx=20)
+        tk.Label(search_frame, text="Search:", font=("Arial", 12)).pack(side=tk.LEFT)
+        self.search_entry = tk.Entry(search_frame, font=("Arial", 12))
+        self.search_entry.pack(side=tk.LEFT, fill="x", expand=True, padx=5)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search = None
+        self.search_pending = None
+
+        # Create treeview to show the inventory; only the visible window of rows
+        # is ever inserted, scrolling pages rows in from the in-memory stock catalog
+        tree_frame = tk.Frame(self)
+        tree_frame.pack(pady=10, fill="x", padx=20)
+        self.tree = ttk.Treeview(tree_frame, columns=("ID", "Name", "Qty", "Price"), show="headings",
+                                 height=self.PAGE_SIZE)
+        for column, text, sort in (("ID", "ID", "id"), ("Name", "Name", "name"),
+                                   ("Qty", "Quantity", "quantity"), ("Price", "Price ₹", "price")):
+            self.tree.heading(column, text=text, command=lambda s=sort: self.sort_by(s))
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="x", expand=True)
+        self.stock = TreeSync(self.tree)
+
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_by(-3 if e.delta > 0 else 3, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_by(-3, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_by(3, "units"))
+        self.tree.bind("<Up>", lambda e: self.on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self.on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll_by(1, "pages"))
+
+        self.sort = "id"
+        self.descending = False
+        self.total = 0
+        self.top = 0  # index of the first visible row
+        self.rows = []  # fetched rows, contiguous in display order
+        self.rows_start = 0  # index of self.rows[0]
 
         # Button frame to hold Refresh, Delete and Back buttons
         btn_frame = tk.Frame(self)
@@ -407,15 +2156,130 @@ class ViewStockPage(tk.Frame):
         tk.Button(btn_frame, text="Generate Bill", font=("Arial", 12), command=self.generate_bill).pack(side=tk.LEFT,
                                                                                                         padx=10)
 
+        # Reorder level of the selected item, for the Dashboard's low stock list
+        tk.Button(self, text="Reorder Level...", font=("Arial", 10), command=self.set_reorder_level).pack(pady=5)
+
+        # Background PDF status; click to retry failed bills
+        self.pdf_status = tk.Label(self, text="", font=("Arial", 10))
+        self.pdf_status.pack(pady=5)
+        self.pdf_status.bind("<Button-1>", lambda e: master.pdf_queue.retry_failed())
+        master.pdf_queue.listeners.append(self.show_pdf_status)
+
+    def on_search_key(self, event):
+        if self.search_pending is not None:
+            self.after_cancel(self.search_pending)
+        self.search_pending = self.after(150, self.apply_search)
+
+    def apply_search(self):
+        self.search_pending = None
+        search = self.search_entry.get().strip() or None
+        if search != self.search:
+            self.search = search
+            self.top = 0
+            self.load_data()
+
+    @timed("load_data")
     def load_data(self):
-        # Clear the existing entries in the treeview
-        for i in self.tree.get_children():
-            self.tree.delete(i)
+        # Drop the buffered rows and fetch the current window again
+        try:
+            self.total = backend.count_stock(self.search)
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Cannot load the stock: {db_err}")
+            return
+        self.rows = []
+        self.scroll_to(self.top)
+
+    def on_db_change(self):
+        # Another terminal changed stock: refetch the window at the same position
+        self.load_data()
+
+    def sort_by(self, sort):
+        # Sorted views are kept by the stock catalog; clicking the same heading again reverses it
+        self.descending = not self.descending if sort == self.sort else False
+        self.sort = sort
+        self.top = 0
+        self.load_data()
+
+    @timed("stock scroll")
+    def scroll_to(self, top):
+        top = max(0, min(top, self.total - self.PAGE_SIZE))
+        end = min(top + self.PAGE_SIZE, self.total)
+        rows_end = self.rows_start + len(self.rows)
 
-        # Fetch and display data from the inventory table
-        cursor.execute("SELECT id, name, quantity, price FROM inventory")
-        for row in cursor.fetchall():
-            self.tree.insert("", "end", values=row)
+        try:
+            if self.rows and self.rows_start <= top and end <= rows_end:
+                pass  # already buffered
+            elif self.rows and rows_end <= end <= rows_end + self.BUFFER and top >= self.rows_start:
+                # Scrolled past the end of the buffer: continue after its last row
+                after = stock_key(self.rows[-1], self.sort)
+                self.rows += backend.fetch_stock_page(self.sort, self.descending, after=after,
+                                                      limit=end - rows_end + self.BUFFER, search=self.search)
+            elif self.rows and self.rows_start - self.BUFFER <= top < self.rows_start and end <= rows_end:
+                # Scrolled before the start of the buffer: continue before its first row
+                before = stock_key(self.rows[0], self.sort)
+                wanted = self.rows_start - top + self.BUFFER
+                fetched = backend.fetch_stock_page(self.sort, self.descending, before=before, limit=wanted,
+                                                   search=self.search)
+                self.rows = fetched + self.rows
+                # A short page means the start of the table was reached
+                self.rows_start = self.rows_start - len(fetched) if len(fetched) == wanted else 0
+            else:
+                # Jumped somewhere else entirely
+                rows_start = max(0, top - self.BUFFER)
+                self.rows = backend.fetch_stock_at(self.sort, self.descending, offset=rows_start,
+                                                   limit=top - rows_start + self.PAGE_SIZE + self.BUFFER,
+                                                   search=self.search)
+                self.rows_start = rows_start
+        except sqlite3.DatabaseError as db_err:
+            # The buffer is left as it was; the window stays where it is
+            messagebox.showerror("Database Error", f"Cannot load the stock: {db_err}")
+            return
+
+        # Keep at most BUFFER rows materialized on either side of the window
+        drop = top - self.BUFFER - self.rows_start
+        if drop > 0:
+            del self.rows[:drop]
+            self.rows_start += drop
+        del self.rows[end + self.BUFFER - self.rows_start:]
+
+        self.top = top
+        self.show_rows(self.rows[top - self.rows_start:end - self.rows_start])
+        if self.total:
+            self.scrollbar.set(top / self.total, end / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def show_rows(self, rows):
+        # Rows still in view keep their treeview item, and with it any selection
+        self.stock.sync([(row[0], row) for row in rows])
+
+    def scroll_by(self, amount, what):
+        step = self.PAGE_SIZE if what == "pages" else 1
+        self.scroll_to(self.top + int(amount) * step)
+        return "break"
+
+    def on_scrollbar(self, action, *args):
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * self.total))
+        elif action == "scroll":
+            self.scroll_by(args[0], args[1])
+
+    def on_arrow(self, step):
+        # Moving the focus off the edge of the window scrolls it instead
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        if not children or focus not in children:
+            return None
+        index = children.index(focus) + step
+        if 0 <= index < len(children):
+            return None  # let the treeview move the focus itself
+        self.scroll_by(step, "units")
+        children = self.tree.get_children()
+        if children:
+            target = children[0] if step < 0 else children[-1]
+            self.tree.focus(target)
+            self.tree.selection_set(target)
+        return "break"
 
     def delete_item(self):
         # Get the selected item (stock) from the treeview
@@ -434,18 +2298,39 @@ class ViewStockPage(tk.Frame):
         if confirm:
             try:
                 # Delete the selected item from the database
-                cursor.execute("DELETE FROM inventory WHERE id=?", (item_id,))
-                conn.commit()
+                backend.delete_stock(item_id)
                 messagebox.showinfo("Success", "Item deleted!")
 
-                # Refresh the treeview after deletion
-                self.load_data()
+                # Drop just this row; the window is refilled from the buffer
+                self.rows = [row for row in self.rows if row[0] != item_id]
+                self.total -= 1
+                self.scroll_to(self.top)
 
             except sqlite3.DatabaseError as db_err:
                 messagebox.showerror("Database Error", f"An error occurred: {db_err}")
             except Exception as e:
                 messagebox.showerror("Error", f"An unexpected error occurred: {e}")
 
+    def set_reorder_level(self):
+        selected_item = self.tree.selection()
+        if not selected_item:
+            messagebox.showerror("Error", "Please select an item first.")
+            return
+        item_id, name = self.tree.item(selected_item[0])["values"][:2]
+        if ask_reorder_level(self, item_id, name):
+            messagebox.showinfo("Success", f"Reorder level of {name} saved.")
+
+    def show_pdf_status(self, pending, failed):
+        if failed:
+            names = ", ".join(os.path.basename(job["filename"]) for job, _ in failed[-3:])
+            self.pdf_status.config(text=f"Bill PDFs: {pending} pending, {len(failed)} failed ({names}) - click to retry",
+                                   fg="red", cursor="hand2")
+        elif pending:
+            self.pdf_status.config(text=f"Bill PDFs: {pending} pending", fg="black", cursor="")
+        else:
+            self.pdf_status.config(text="", cursor="")
+
+    @timed("generate_bill")
     def generate_bill(self):
         selected_items = self.tree.selection()
         if not selected_items:
@@ -456,14 +2341,20 @@ class ViewStockPage(tk.Frame):
         if not customer_name:
             return
 
-        total_price = 0
-        items_list = []
+        # Quantities offered below must not be older than the last commit from another
+        # terminal, so they are read from the catalog rather than the treeview's text
+        try:
+            self.master.check_for_changes()
+            stock = backend.get_stock([int(iid) for iid in selected_items])
+        except sqlite3.DatabaseError as db_err:
+            messagebox.showerror("Database Error", f"Cannot read the stock: {db_err}")
+            return
 
-        for selected_item in selected_items:
-            item_values = self.tree.item(selected_item)["values"]
-            item_name = item_values[1]
-            available_qty = int(item_values[2])
-            item_price = float(item_values[3])
+        lines = []
+        for item_id, item_name, available_qty, _ in stock:
+            if available_qty < 1:
+                messagebox.showwarning("Warning", f"Not enough stock for {item_name}. Skipping item.")
+                continue
 
             # Ask user for quantity
             purchase_qty = simpledialog.askinteger("Quantity",
@@ -472,102 +2363,975 @@ class ViewStockPage(tk.Frame):
             if purchase_qty is None:
                 continue  # Skip if cancelled
 
-            if purchase_qty > available_qty:
-                messagebox.showwarning("Warning", f"Not enough stock for {item_name}. Skipping item.")
-                continue
-
-            total_price += purchase_qty * item_price
-            items_list.append((item_name, purchase_qty, item_price, purchase_qty * item_price))
-
-            # Deduct quantity from treeview
-            new_qty = available_qty - purchase_qty
-            self.tree.item(selected_item, values=(item_values[0], item_name, new_qty, item_price))
+            lines.append((item_id, purchase_qty))
 
-        if not items_list:
+        if not lines:
             messagebox.showerror("Error", "No items were processed for billing.")
             return
 
-        # === Update inventory in database ===
+        # Stock deduction and the bill are written in one transaction
+        bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         try:
-            conn = sqlite3.connect("inventory.db")  # or your DB file path
-            cursor = conn.cursor()
-            for name, qty, _, _ in items_list:
-                cursor.execute("UPDATE inventory SET quantity = quantity - ? WHERE name = ?", (qty, name))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Failed to update stock in database: {str(e)}")
+            bill_id, items_list, total_price, gst, final_price = backend.checkout(customer_name, lines, bill_date)
+        except OutOfStockError as e:
+            messagebox.showerror("Error", f"{e}\nThe stock list has been refreshed; nothing was billed.")
+            self.load_data()
+            return
+        except sqlite3.DatabaseError as db_err:
+            if is_busy(db_err):
+                messagebox.showerror("Database Busy", "Another till is holding the database; nothing was billed. "
+                                                      "Try again in a moment.")
+            else:
+                messagebox.showerror("Database Error", f"Failed to save the bill: {db_err}")
             return
 
-        gst = total_price * 0.15
-        final_price = total_price + gst
+        # Show the new quantities
+        self.load_data()
 
+        # The PDF is rendered in the background; the sale is already recorded
         filename = f"{customer_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}.pdf"
-        self.create_pdf(items_list, total_price, gst, final_price, customer_name, filename)
-
+        if self.master.pdf_queue.submit(create_pdf, items_list, total_price, gst, final_price, customer_name,
+                                        filename, bill_date, filename=filename):
+            messagebox.showinfo("Success", "Bill saved to history and stock updated! The PDF is being generated.")
+        else:
+            messagebox.showwarning("Bill saved", "Bill saved to history and stock updated, but too many PDFs are "
+                                                 "waiting. Click the PDF status below to retry this one later.")
+
+
+# Invoice page layout, in points on a letter page
+INVOICE_LINE = 20
+INVOICE_FIRST_LINE = 100  # below the top edge
+INVOICE_BOTTOM = 90  # lowest baseline for item lines; the page footer sits below
+INVOICE_TOTAL_LINES = 4  # page total plus total, GST and final price
+
+
+@functools.lru_cache(maxsize=4096)
+def text_width(text, font, size):
+    # Item lines, totals and dates repeat a lot, so their widths are cached
+    from reportlab.pdfbase import pdfmetrics
+    return pdfmetrics.stringWidth(text, font, size)
+
+
+class InvoiceRenderer:
+    # Draws bills onto a canvas, breaking long bills over several pages with the
+    # header repeated and a page total on each. The static part of the page is a
+    # form drawn once per canvas and reused, so a day book of many bills shares it.
+    def __init__(self, c):
+        from reportlab.lib.pagesizes import letter
+        self.c = c
+        self.width, self.height = letter
+        self.template = None
+
+    def centered(self, text, y, font="Helvetica", size=12):
+        self.c.setFont(font, size)
+        self.c.drawString((self.width - text_width(text, font, size)) / 2, y, text)
+
+    def use_template(self):
+        if self.template is None:
+            self.template = "invoice-page"
+            self.c.beginForm(self.template)
+            self.centered("INVENTORY BILL", self.height - 50, size=16)
+            self.c.line(50, self.height - 80, self.width - 50, self.height - 80)
+            self.c.endForm()
+        self.c.doForm(self.template)
+
+    def paginate(self, items):
+        per_page = int((self.height - INVOICE_FIRST_LINE - INVOICE_BOTTOM) // INVOICE_LINE) + 1
+        pages = []
+        start = 0
+        last_page = per_page - INVOICE_TOTAL_LINES  # items that fit beside the totals
+        # Keep going until what is left fits on one page together with the totals;
+        # a cut never takes the items that could share the last page with them
+        while len(items) - start > last_page:
+            take = min(per_page, len(items) - start - last_page)
+            pages.append(items[start:start + take])
+            start += take
+        pages.append(items[start:])
+        return pages
+
+    def render_bill(self, bill_date, customer_name, items, total_price, gst, final_price):
+        c = self.c
+        pages = self.paginate(items)
+        for number, page_items in enumerate(pages, start=1):
+            self.use_template()
+
+            # Date top right
+            c.setFont("Helvetica", 8)
+            date_width = text_width(bill_date, "Helvetica", 8)
+            c.drawString(self.width - 100 - date_width, self.height - 50, f"Bill Date: {bill_date}")
+            if len(pages) > 1:
+                c.drawString(self.width - 100 - date_width, self.height - 62, f"Page {number} of {len(pages)}")
+
+            # Customer name centered
+            self.centered(f"Customer: {customer_name}", self.height - 70)
+
+            # Items
+            y = self.height - INVOICE_FIRST_LINE
+            for item in page_items:
+                self.centered(f"{item[1]} x {item[0]} @ Rs. {item[2]:.2f} = Rs. {item[3]:.2f}", y)
+                y -= INVOICE_LINE
+
+            if len(pages) > 1:
+                page_total = sum(item[3] for item in page_items)
+                self.centered(f"Page {number} total: Rs. {page_total:.2f}", y, size=10)
+                y -= INVOICE_LINE
+
+            if number < len(pages):
+                self.centered("Continued on next page", 40, size=8)
+            else:
+                # Totals
+                for i, line in enumerate([
+                    f"Total Price: Rs. {total_price:.2f}",
+                    f"GST (15%): Rs. {gst:.2f}",
+                    f"Final Price: Rs. {final_price:.2f}"
+                ]):
+                    self.centered(line, y - (i * INVOICE_LINE))
+            c.showPage()
+
+
+def new_canvas(filename):
+    # ReportLab is only imported once a PDF is actually made, which keeps it out of startup
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    return canvas.Canvas(filename, pagesize=letter)
+
+
+@timed("create_pdf")
+def create_pdf(items, total_price, gst, final_price, customer_name, filename, bill_date=None):
+    if bill_date is None:
+        bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    c = new_canvas(filename)
+    InvoiceRenderer(c).render_bill(bill_date, customer_name, items, total_price, gst, final_price)
+    c.save()
+
+
+@timed("create_invoice_book")
+def create_invoice_book(day, filename):
+    # Every bill of one day (YYYY-MM-DD) in a single PDF, streamed from the
+    # database in one pass. Runs on a PDF worker thread with that thread's connection.
+    rows = backend.day_bill_rows(day)
+
+    c = new_canvas(filename)
+    renderer = InvoiceRenderer(c)
+    bills = 0
+    bill, items = None, []
+    for row in rows:
+        if bill is not None and row[0] != bill[0]:
+            renderer.render_bill(bill[1], bill[2], items, *bill[3:6])
+            bills += 1
+            items = []
+        bill = row
+        items.append(row[6:10])
+    if bill is not None:
+        renderer.render_bill(bill[1], bill[2], items, *bill[3:6])
+        bills += 1
+    else:
+        renderer.use_template()
+        renderer.centered(f"No bills on {day}", renderer.height - INVOICE_FIRST_LINE)
+        c.showPage()
+    c.save()
+    return bills
+
+
+class PdfQueue:
+    # Renders PDFs on worker threads so a checkout never waits on ReportLab.
+    # Results are handed back to the Tk thread by poll(), which reschedules
+    # itself with after(); listeners are called there with (pending, failed).
+    SUBMIT_WAIT = 0.2  # seconds submit may block the Tk thread for a free slot
+
+    def __init__(self, workers=2, max_pending=32):
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.results = queue.Queue()
+        self.pending = 0
+        self.failed = []  # (job, error) pairs, kept so they can be retried
+        self.listeners = []
+        for _ in range(workers):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def run(self, job):
         try:
-            bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            csv_filename = "bill_history.csv"
-            file_exists = os.path.exists(csv_filename)
-
-            with open(csv_filename, mode="a", newline="") as file:
-                writer = csv.writer(file)
-                if not file_exists:
-                    writer.writerow(
-                        ["Bill Date", "Customer Name", "Item Name", "Quantity", "Price", "Total Price", "GST",
-                         "Final Price"])
-                for item in items_list:
-                    writer.writerow([bill_date, customer_name, item[0], item[1], item[2], item[3], gst, final_price])
-
-            messagebox.showinfo("Success", "Bill generated, stock updated, and saved to history!")
-
+            job["render"](*job["args"])
+            return None
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save bill to CSV: {str(e)}")
-            print(f"Error: {e}")
-
-    def create_pdf(self, items, total_price, gst, final_price, customer_name, filename):
-        c = canvas.Canvas(filename, pagesize=letter)
-        width, height = letter
+            return e
 
-        # Title
-        c.setFont("Helvetica", 16)
-        title = "INVENTORY BILL"
-        title_width = c.stringWidth(title, "Helvetica", 16)
-        c.drawString((width - title_width) / 2, height - 50, title)
-
-        # Date top right
-        bill_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        c.setFont("Helvetica", 8)
-        date_width = c.stringWidth(bill_date, "Helvetica", 8)
-        c.drawString(width - 100 - date_width, height - 50, f"Bill Date: {bill_date}")
-
-        # Customer name centered
-        c.setFont("Helvetica", 12)
-        customer_line = f"Customer: {customer_name}"
-        cust_width = c.stringWidth(customer_line, "Helvetica", 12)
-        c.drawString((width - cust_width) / 2, height - 70, customer_line)
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self.results.put((job, self.run(job)))
+            finally:
+                self.jobs.task_done()
+
+    def submit(self, render, *args, filename, on_done=None):
+        # render(*args) writes filename; on_done(filename, error) runs on the Tk thread.
+        # Returns False if the queue stayed full: the job is then reported as
+        # failed, to be retried later, rather than rendered on the Tk thread.
+        job = {"render": render, "args": args, "filename": filename, "on_done": on_done}
+        self.pending += 1
+        try:
+            self.jobs.put(job, timeout=self.SUBMIT_WAIT)
+        except queue.Full:
+            self.results.put((job, RuntimeError("too many PDFs waiting; retry when they are done")))
+            return False
+        self.notify()
+        return True
+
+    def retry_failed(self):
+        failed, self.failed = self.failed, []
+        for number, (job, error) in enumerate(failed):
+            if not self.submit(job["render"], *job["args"], filename=job["filename"], on_done=job["on_done"]):
+                self.failed += failed[number + 1:]  # still busy; keep the rest for the next retry
+                break
+        self.notify()
+
+    def poll(self, widget, interval=100):
+        while True:
+            try:
+                job, error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            if error is not None:
+                self.failed.append((job, error))
+            if job["on_done"]:
+                job["on_done"](job["filename"], error)
+            self.notify()
+        widget.after(interval, self.poll, widget, interval)
+
+    def notify(self):
+        for listener in self.listeners:
+            listener(self.pending, self.failed)
+
+    def wait(self):
+        self.jobs.join()
+
+
+def order_filename(customer_name, bill_id):
+    # Order files come from outside, so keep customer names filesystem safe
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in customer_name)[:40]
+    return f"{safe or 'bill'}_{bill_id}.pdf"
+
+
+def read_orders(path):
+    # Yields (reference, customer, bill date or None, [item refs]) per order. An item
+    # ref is {"id": ...} or {"name": ..., "price": optional}, plus "qty".
+    # JSON: a list of {"customer", "items": [...], "date"?} (or {"orders": [...]}).
+    # CSV: one line per item with order,customer,quantity and item_id or item[,price].
+    # Orders are passed on as found; check_order rejects bad ones one at a time.
+    # A file that can't hold orders at all raises ValueError.
+    if path.lower().endswith(".json"):
+        with open(path, mode="r", encoding="utf-8") as file:
+            orders = json.load(file)
+        if isinstance(orders, dict):
+            orders = orders.get("orders")
+        if not isinstance(orders, list):
+            raise ValueError(f"{os.path.basename(path)} is not a list of orders")
+        for number, order in enumerate(orders, start=1):
+            if not isinstance(order, dict):
+                yield number, None, None, None
+                continue
+            yield order.get("id", number), order.get("customer"), order.get("date"), order.get("items")
+        return
+
+    with open(path, mode="r", newline="", encoding="utf-8-sig") as file:
+        reader = csv.DictReader(file)
+        header = {name.strip().lower() for name in reader.fieldnames or [] if name}
+        missing = [name for name in ("order", "customer", "quantity") if name not in header]
+        if "item_id" not in header and "item" not in header:
+            missing.append("item_id or item")
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} has no {', '.join(missing)} column")
+        current, customer, items = None, None, []
+        for row in reader:
+            row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+            if row["order"] != current:
+                if items:
+                    yield current, customer, None, items
+                current, customer, items = row["order"], row["customer"], []
+            item = {"qty": row["quantity"]}
+            if row.get("item_id"):
+                item["id"] = row["item_id"]
+            else:
+                item["name"] = row["item"]
+                if row.get("price"):
+                    item["price"] = row["price"]
+            items.append(item)
+        if items:
+            yield current, customer, None, items
+
+
+def order_quantity(value):
+    # A quantity from an order file: a whole number, given as one or as text
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool)):
+        return int(value)
+    raise ValueError(f"quantity {value!r} is not a whole number")
+
+
+def check_order(customer_name, bill_date, items):
+    # Raises ValueError if an order from read_orders can't be billed as given
+    if not isinstance(customer_name, str) or not customer_name.strip():
+        raise ValueError("no customer")
+    if bill_date is not None:
+        # Bills and the sales rollups are keyed on this exact format; strptime alone
+        # also takes single digit fields, which would not sort or group as text
+        try:
+            valid = datetime.strptime(bill_date, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S") == bill_date
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValueError(f"date {bill_date!r} is not YYYY-MM-DD HH:MM:SS")
+    if not isinstance(items, list) or not items:
+        raise ValueError("no items")
+    for item in items:
+        if not isinstance(item, dict) or "qty" not in item or ("id" not in item and "name" not in item):
+            raise ValueError(f"bad item {item!r}: needs qty and id or name")
+        order_quantity(item["qty"])
+
+
+def resolve_order_items(conn, items, names):
+    # Turns item refs into [(inventory id, quantity)]; names caches name lookups
+    lines = []
+    for item in items:
+        qty = order_quantity(item["qty"])
+        if "id" in item:
+            lines.append((int(item["id"]), qty))
+            continue
+        key = (item["name"], float(item["price"]) if "price" in item else None)
+        if key not in names:
+            if key[1] is None:
+                found = conn.execute("SELECT id FROM inventory WHERE name = ? LIMIT 2", (key[0],)).fetchall()
+                if len(found) > 1:
+                    raise ValueError(f"{key[0]} is stocked at several prices; give a price or an item id")
+            else:
+                found = conn.execute("SELECT id FROM inventory WHERE name = ? AND price = ?", key).fetchall()
+            if not found:
+                raise ValueError(f"No stock item {key[0]}")
+            names[key] = found[0][0]
+        lines.append((names[key], qty))
+    return lines
+
+
+def render_bill_jobs(jobs):
+    # Runs in a PDF worker process; returns the bills that could not be rendered
+    failed = []
+    for job in jobs:
+        try:
+            create_pdf(*job)
+        except Exception as e:
+            failed.append(f"{job[5]}: {e}")
+    return failed
+
+
+def run_batch_billing(conn, path, batch_size=200, pdf_dir=None, workers=None, out=sys.stdout):
+    # Checks out every order in path, batch_size bills per transaction with a
+    # savepoint per bill so one bad order does not undo the others. PDFs are
+    # rendered by a process pool while later batches are still being billed.
+    started = time.perf_counter()
+    billed = failed = lines_sold = 0
+    names = {}
+    pending = []  # create_pdf arguments of committed bills not yet handed to the pool
+    renders = []
+    pool = None
+    if pdf_dir is not None:
+        os.makedirs(pdf_dir, exist_ok=True)
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+    cur = conn.cursor()
+    in_batch = 0
+    try:
+        for reference, customer_name, bill_date, items in read_orders(path):
+            if not conn.in_transaction:
+                begin_immediate(cur)
+            cur.execute("SAVEPOINT bill")
+            try:
+                check_order(customer_name, bill_date, items)
+                lines = resolve_order_items(conn, items, names)
+                bill_date = bill_date or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                bill_id, sold, total_price, gst, final_price = sell_items(cur, customer_name, lines, bill_date)
+                cur.execute("RELEASE bill")
+            except (OutOfStockError, ValueError, KeyError, TypeError) as e:
+                cur.execute("ROLLBACK TO bill")
+                cur.execute("RELEASE bill")
+                failed += 1
+                print(f"Order {reference}: {e}", file=sys.stderr)
+                continue
 
-        c.line(50, height - 80, width - 50, height - 80)
+            billed += 1
+            lines_sold += len(sold)
+            in_batch += 1
+            if pool is not None:
+                filename = os.path.join(pdf_dir, order_filename(customer_name, bill_id))
+                pending.append((sold, total_price, gst, final_price, customer_name, filename, bill_date))
+            if in_batch >= batch_size:
+                conn.commit()
+                in_batch = 0
+                if pool is not None:
+                    renders += [pool.submit(render_bill_jobs, pending[i:i + 16]) for i in range(0, len(pending), 16)]
+                    pending = []
+        if conn.in_transaction:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        pending = []  # those bills are gone and their ids will be reused; no PDFs for them
+        raise
+    finally:
+        billing_done = time.perf_counter()
+        pdf_failed = []
+        if pool is not None:
+            renders += [pool.submit(render_bill_jobs, pending[i:i + 16]) for i in range(0, len(pending), 16)]
+            for render in renders:
+                pdf_failed += render.result()
+            pool.shutdown()
+
+    for failure in pdf_failed:
+        print(f"PDF {failure}", file=sys.stderr)
+    finished = time.perf_counter()
+    seconds = finished - started
+    print(f"Billed {billed} orders ({lines_sold} lines), {failed} failed", file=out)
+    print(f"Checkout: {billing_done - started:.2f}s, {billed / max(billing_done - started, 1e-9):.0f} bills/s", file=out)
+    if pool is not None:
+        print(f"PDFs: {billed - len(pdf_failed)} written to {pdf_dir}, {len(pdf_failed)} failed, "
+              f"finished {finished - billing_done:.2f}s after the last bill", file=out)
+    print(f"Total: {seconds:.2f}s, {billed / max(seconds, 1e-9):.0f} bills/s", file=out)
+    return billed, failed
+
+
+# What the exporter writes, with the columns of each; deleted is 1 on the
+# tombstone rows of items removed since the last incremental export
+EXPORT_DATASETS = {
+    "inventory": ("id", "name", "quantity", "price", "deleted"),
+    "bills": ("id", "date", "customer_name", "total_price", "gst", "final_price"),
+    "bill_items": ("id", "bill_id", "item_name", "quantity", "price", "total_price", "inventory_id", "cost"),
+}
+EXPORT_CHUNK_ROWS = 5000
+
+
+def export_rows(conn, dataset, since=None):
+    # (cursor, watermark, incremental) for one dataset. since is the watermark
+    # the last incremental export reached, None for everything. Bills and their
+    # lines are only ever appended, so their watermark is the last id; inventory
+    # changes come from the stock_changes log, unless it was trimmed past since.
+    if dataset == "inventory":
+        last = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'stock_changes'").fetchone()
+        last = last[0] if last else 0
+        first = conn.execute("SELECT MIN(seq) FROM stock_changes").fetchone()[0]
+        if since is not None and since <= last and (first is None or first <= since + 1):
+            return conn.execute("""SELECT c.item_id, i.name, i.quantity, i.price, i.id IS NULL
+                                   FROM (SELECT DISTINCT item_id FROM stock_changes WHERE seq > ?) c
+                                   LEFT JOIN inventory i ON i.id = c.item_id ORDER BY c.item_id""",
+                                (since,)), last, True
+        return conn.execute("SELECT id, name, quantity, price, 0 FROM inventory ORDER BY id"), last, False
+
+    columns = ", ".join(EXPORT_DATASETS[dataset])
+    last = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {dataset}").fetchone()[0]
+    if since is None or since > last:
+        since, incremental = 0, False
+    else:
+        incremental = True
+    return conn.execute(f"SELECT {columns} FROM {dataset} WHERE id > ? ORDER BY id", (since,)), last, incremental
+
+
+def fetch_chunks(cursor, size):
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            return
+        yield rows
+
+
+# Each writer streams chunks of rows to path and returns how many it wrote
+
+def write_csv_export(path, columns, chunks):
+    count = 0
+    with open(path, mode="w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_jsonl_export(path, columns, chunks):
+    count = 0
+    with open(path, mode="w", encoding="utf-8") as file:
+        for rows in chunks:
+            file.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            count += len(rows)
+    return count
+
+
+def write_columnar_export(path, columns, chunks):
+    # Gzipped JSON lines: {"columns": [...]} first, then one line per chunk
+    # holding a list of values per column, which packs much tighter than rows
+    count = 0
+    with gzip.open(path, mode="wt", compresslevel=6, encoding="utf-8") as file:
+        file.write(json.dumps({"columns": list(columns)}) + "\n")
+        for rows in chunks:
+            file.write(json.dumps([list(values) for values in zip(*rows)]) + "\n")
+            count += len(rows)
+    return count
+
+
+def read_columnar_export(path):
+    # Yields the rows of a columnar export as tuples
+    with gzip.open(path, mode="rt", encoding="utf-8") as file:
+        file.readline()
+        for line in file:
+            yield from zip(*json.loads(line))
+
+
+EXPORT_FORMATS = {
+    "csv": (".csv", write_csv_export),
+    "jsonl": (".jsonl", write_jsonl_export),
+    "columnar": (".columns.json.gz", write_columnar_export),
+}
+
+
+@timed("export")
+def export_data(conn, directory, fmt="csv", datasets=None, changes=False, chunk_rows=EXPORT_CHUNK_ROWS):
+    # Streams each dataset to its own file in directory, chunk_rows at a time, so
+    # memory use stays flat however big the tables are. All datasets are read
+    # from one snapshot. With changes=True only rows added or changed since the
+    # last incremental export in this format are written (everything the first
+    # time, or when the changes since the last one are no longer on record);
+    # its watermark moves on once the files are complete.
+    # Returns [(dataset, path, rows, incremental, fell_back)], fell_back being
+    # True where changes were asked for but everything had to be written.
+    extension, write = EXPORT_FORMATS[fmt]
+    datasets = list(datasets or EXPORT_DATASETS)
+    for dataset in datasets:
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    written = []
+    watermarks = []
+    conn.execute("BEGIN")
+    try:
+        for dataset in datasets:
+            key = f"export_watermark:{dataset}:{fmt}"
+            since = get_meta(conn, key) if changes else None
+            cursor, last, incremental = export_rows(conn, dataset, None if since is None else int(since))
+            name = f"{dataset}_changes_{stamp}" if incremental else f"{dataset}_{stamp}"
+            path = os.path.join(directory, name + extension)
+            copy = 1
+            while os.path.exists(path):  # never overwrite an earlier export of the same second
+                copy += 1
+                path = os.path.join(directory, f"{name}_{copy}{extension}")
+            rows = write(path, EXPORT_DATASETS[dataset], fetch_chunks(cursor, chunk_rows))
+            written.append((dataset, path, rows, incremental, since is not None and not incremental))
+            watermarks.append((key, last))
+    finally:
+        conn.rollback()  # nothing was written, this only ends the snapshot
+
+    if changes:
+        cur = conn.cursor()
+        for key, last in watermarks:
+            set_meta(cur, key, last)
+        conn.commit()
+    return written
+
+
+def describe_export(written):
+    lines = []
+    for dataset, path, rows, incremental, fell_back in written:
+        line = f"{dataset}: {rows} {'changed ' if incremental else ''}rows -> {path}"
+        if fell_back:
+            line += " (full export: the changes since the last export are no longer on record)"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+class InventoryService(LocalBackend):
+    # The inventory server's side of the calls: one connection does all the
+    # reading and writing through a warm catalog, and a change counter lets
+    # clients notice each other's writes
+    def __init__(self, conn):
+        super().__init__(conn)
+        self.changes = 0
+        self.lock = threading.RLock()  # held by the request handler around every call
+
+    def data_version(self):
+        return f"{super().data_version()}.{self.changes}"
+
+    def add_stock(self, name, qty, price, cost=None):
+        super().add_stock(name, qty, price, cost)
+        self.changes += 1
+
+    def delete_stock(self, item_id):
+        super().delete_stock(item_id)
+        self.changes += 1
+
+    def set_reorder_level(self, item_id, level):
+        super().set_reorder_level(item_id, level)
+        self.changes += 1
+
+    def import_stock_csv(self, path):
+        result = super().import_stock_csv(path)
+        self.changes += 1
+        return result
+
+    def checkout(self, customer_name, lines, bill_date=None):
+        result = super().checkout(customer_name, lines, bill_date)
+        self.changes += 1
+        return result
+
+    def import_bill_history(self, path):
+        rows = super().import_bill_history(path)
+        if rows:
+            self.changes += 1
+        return rows
+
+
+# Files the server reads and writes for its clients stay in its own folder;
+# requests never name a path on the server
+server_export_dir = os.path.join(base_dir, "exports")
+
+
+def make_request_handler(service, token):
+    # HTTP/JSON front of an InventoryService. Every request must carry the
+    # server's token as "Authorization: Bearer <token>", or it gets a 401.
+    # Query values arrive as strings, bodies as JSON except an uploaded stock
+    # CSV (text/csv); OutOfStockError is a 409 and bad input a 400.
+    import hmac
+    import tempfile
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import urlsplit, parse_qs
+
+    def import_stock_upload(query, body):
+        if not isinstance(body, bytes):
+            raise ValueError("Send the stock CSV as the request body (Content-Type: text/csv)")
+        file = tempfile.NamedTemporaryFile(mode="wb", suffix=".csv", delete=False)
+        try:
+            with file:
+                file.write(body)
+            return service.import_stock_csv(file.name)
+        finally:
+            os.remove(file.name)
+
+    def add_stock_request(query, body):
+        qty, price = int(body["quantity"]), float(body["price"])
+        cost = None if body.get("cost") is None else float(body["cost"])
+        check_stock_entry(qty, price, cost)
+        service.add_stock(body["name"], qty, price, cost)
+
+    def stock_rows(query, body):
+        sort = query.get("sort", "id")
+        descending = query.get("desc") == "1"
+        limit = int(query.get("limit", 50))
+        search = query.get("search")
+        if "offset" in query:
+            return service.fetch_stock_at(sort, descending, int(query["offset"]), limit, search)
+        after = tuple(json.loads(query["after"])) if "after" in query else None
+        before = tuple(json.loads(query["before"])) if "before" in query else None
+        return service.fetch_stock_page(sort, descending, after, before, limit, search)
+
+    routes = {
+        ("GET", "/version"): lambda query, body: {"version": service.data_version()},
+        ("POST", "/login"): lambda query, body: {"ok": service.login(body["username"], body["password"])},
+        ("POST", "/signup"): lambda query, body: {"ok": service.signup(body["username"], body["password"])},
+        ("GET", "/stock/count"): lambda query, body: {"total": service.count_stock(query.get("search"))},
+        ("GET", "/stock/items"): lambda query, body: service.get_stock(
+            [int(item_id) for item_id in query.get("ids", "").split(",") if item_id]),
+        ("GET", "/stock"): stock_rows,
+        ("POST", "/stock"): add_stock_request,
+        ("DELETE", "/stock"): lambda query, body: service.delete_stock(int(query["id"])),
+        ("GET", "/stock/low"): lambda query, body: service.low_stock(int(query.get("limit", 50))),
+        ("POST", "/stock/reorder"): lambda query, body: service.set_reorder_level(int(body["id"]), int(body["level"])),
+        ("POST", "/stock/import"): import_stock_upload,
+        ("POST", "/checkout"): lambda query, body: service.checkout(
+            body["customer_name"], [(int(item_id), int(qty)) for item_id, qty in body["lines"]], body.get("bill_date")),
+        ("GET", "/bills"): lambda query, body: service.bills(int(query.get("after_id", 0)), query.get("start"),
+                                                             query.get("end")),
+        ("GET", "/bills/day"): lambda query, body: service.day_bill_rows(query["day"]).fetchall(),
+        ("POST", "/bills/import"): lambda query, body: service.import_bill_history(bill_history_path),
+        ("POST", "/export"): lambda query, body: service.export_data(
+            server_export_dir, body.get("format", "csv"), body.get("datasets"), bool(body.get("changes"))),
+        ("GET", "/sales/summary"): lambda query, body: service.sales_summary(query.get("start"), query.get("end")),
+        ("GET", "/sales/top"): lambda query, body: service.top_items(int(query.get("limit", 5))),
+    }
+
+    class InventoryRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def handle_call(self, method):
+            started = time.perf_counter()
+            url = urlsplit(self.path)
+            route = routes.get((method, url.path))
+            if route is None:
+                self.reply(404, {"error": f"No such endpoint: {method} {url.path}"})
+                return
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            length = int(self.headers.get("Content-Length") or 0)
+            data = self.rfile.read(length) if length else b""
+            given = self.headers.get("Authorization", "")
+            if not hmac.compare_digest(given.encode(), f"Bearer {token}".encode()):
+                self.reply(401, {"error": "Missing or wrong server token"})
+                return
+            try:
+                if self.headers.get("Content-Type", "").startswith("text/csv"):
+                    body = data
+                else:
+                    body = json.loads(data) if data else {}
+                with service.lock:
+                    result = route(query, body)
+            except OutOfStockError as e:
+                self.reply(409, {"error": str(e), "out_of_stock": e.names})
+            except (ValueError, KeyError, TypeError, OSError, csv.Error) as e:
+                self.reply(400, {"error": str(e)})
+            except Exception as e:
+                self.reply(500, {"error": str(e)})
+            else:
+                self.reply(200, result)
+            perf_stats.record(f"api: {method} {url.path}", time.perf_counter() - started)
+
+        def reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self.handle_call("GET")
+
+        def do_POST(self):
+            self.handle_call("POST")
+
+        def do_DELETE(self):
+            self.handle_call("DELETE")
+
+        def log_message(self, format, *args):
+            pass  # request timings are in perf_stats instead
+
+    return InventoryRequestHandler
+
+
+def serve(host="127.0.0.1", port=8765, token=None, out=sys.stdout):
+    # Runs the inventory server until interrupted. It owns the database: one
+    # connection, with the stock catalog loaded before the first request.
+    # Without a token one is made up and printed for the clients to use.
+    import secrets
+    from http.server import ThreadingHTTPServer
+    if not token:
+        token = secrets.token_urlsafe(16)
+        print(f"Server token: {token}", file=out)
+    conn = db.connect(check_same_thread=False)
+    service = InventoryService(conn)
+    import_bill_history(conn, bill_history_path)
+    stock_rows = service.count_stock()  # loads the catalog
+    server = ThreadingHTTPServer((host, port), make_request_handler(service, token))
+    server.daemon_threads = True
+    print(f"Inventory server on http://{host}:{server.server_port}/ with {stock_rows} stock rows; "
+          f"Ctrl+C to stop", file=out)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        conn.close()
+
+
+class RemoteError(sqlite3.DatabaseError):
+    # The inventory server failed or could not be reached. A DatabaseError, so
+    # pages report it like any other storage failure.
+    pass
+
+
+class RemoteBackend:
+    # The same calls as LocalBackend, made to an inventory server (main.py serve)
+    def __init__(self, url, token, timeout=30):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def request(self, method, path, query=None, body=None):
+        # body is sent as JSON, or as a CSV upload if it is bytes
+        import urllib.request
+        import urllib.parse
+        import urllib.error
+        started = time.perf_counter()
+        url = self.url + path
+        if query:
+            url += "?" + urllib.parse.urlencode({key: value for key, value in query.items() if value is not None})
+        if isinstance(body, bytes):
+            data, content_type = body, "text/csv"
+        else:
+            data, content_type = (json.dumps(body).encode() if body is not None else None), "application/json"
+        request = urllib.request.Request(url, data=data, method=method, headers={
+            "Content-Type": content_type, "Authorization": f"Bearer {self.token}"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read())
+            except ValueError:
+                error = {"error": str(e)}
+            if e.code == 409 and "out_of_stock" in error:
+                raise OutOfStockError(error["out_of_stock"]) from None
+            if e.code == 400:
+                raise ValueError(error["error"]) from None
+            raise RemoteError(error["error"]) from None
+        except urllib.error.URLError as e:
+            raise RemoteError(f"Cannot reach the inventory server at {self.url}: {e.reason}") from None
+        finally:
+            perf_stats.record(f"api: {method} {path}", time.perf_counter() - started)
+
+    def data_version(self):
+        return self.request("GET", "/version")["version"]
+
+    def login(self, username, password):
+        return self.request("POST", "/login", body={"username": username, "password": password})["ok"]
+
+    def signup(self, username, password):
+        return self.request("POST", "/signup", body={"username": username, "password": password})["ok"]
+
+    def count_stock(self, search=None):
+        return self.request("GET", "/stock/count", {"search": search})["total"]
+
+    def fetch_stock_page(self, sort="id", descending=False, after=None, before=None, limit=50, search=None):
+        query = {"sort": sort, "desc": int(descending), "limit": limit, "search": search,
+                 "after": json.dumps(list(after)) if after is not None else None,
+                 "before": json.dumps(list(before)) if before is not None else None}
+        return [tuple(row) for row in self.request("GET", "/stock", query)]
+
+    def fetch_stock_at(self, sort="id", descending=False, offset=0, limit=50, search=None):
+        query = {"sort": sort, "desc": int(descending), "offset": offset, "limit": limit, "search": search}
+        return [tuple(row) for row in self.request("GET", "/stock", query)]
+
+    def get_stock(self, ids):
+        return [tuple(row) for row in self.request("GET", "/stock/items", {"ids": ",".join(map(str, ids))})]
+
+    def add_stock(self, name, qty, price, cost=None):
+        self.request("POST", "/stock", body={"name": name, "quantity": qty, "price": price, "cost": cost})
+
+    def delete_stock(self, item_id):
+        self.request("DELETE", "/stock", {"id": item_id})
+
+    def low_stock(self, limit=50):
+        count, rows = self.request("GET", "/stock/low", {"limit": limit})
+        return count, [tuple(row) for row in rows]
+
+    def set_reorder_level(self, item_id, level):
+        self.request("POST", "/stock/reorder", body={"id": item_id, "level": level})
+
+    def import_stock_csv(self, path):
+        # Uploaded; the server imports it from a temporary file
+        with open(path, mode="rb") as file:
+            return self.request("POST", "/stock/import", body=file.read())
+
+    def checkout(self, customer_name, lines, bill_date=None):
+        bill_id, items, total_price, gst, final_price = self.request(
+            "POST", "/checkout", body={"customer_name": customer_name, "lines": lines, "bill_date": bill_date})
+        return bill_id, [tuple(item) for item in items], total_price, gst, final_price
+
+    def bills(self, after_id=0, start=None, end=None):
+        return [tuple(row) for row in self.request("GET", "/bills", {"after_id": after_id, "start": start, "end": end})]
+
+    def day_bill_rows(self, day):
+        return [tuple(row) for row in self.request("GET", "/bills/day", {"day": day})]
+
+    def sales_summary(self, start=None, end=None):
+        return tuple(self.request("GET", "/sales/summary", {"start": start, "end": end}))
+
+    def top_items(self, limit=5):
+        return [tuple(row) for row in self.request("GET", "/sales/top", {"limit": limit})]
+
+    def import_bill_history(self, path):
+        # The server imports its own bill_history.csv; this terminal's stays where it is
+        return self.request("POST", "/bills/import", body={})
+
+    def export_data(self, directory, fmt="csv", datasets=None, changes=False):
+        # Written to the exports folder next to the server's database, not to directory
+        written = self.request("POST", "/export", body={"format": fmt, "datasets": datasets, "changes": changes})
+        return [tuple(entry) for entry in written]
+
+
+def main(argv=None):
+    mark_startup("modules loaded")
+    parser = argparse.ArgumentParser(description="Inventory System")
+    parser.add_argument("--startup-report", action="store_true", help="print how long startup took")
+    parser.add_argument("--server", metavar="URL",
+                        help="use an inventory server (e.g. http://127.0.0.1:8765) instead of the database file")
+    parser.add_argument("--token", default=os.environ.get("INVENTORY_SERVER_TOKEN"),
+                        help="the inventory server's token (default: INVENTORY_SERVER_TOKEN); "
+                             "with serve, the token clients must send")
+    parser.add_argument("--journal-mode", choices=["WAL", "DELETE", "TRUNCATE"], type=str.upper,
+                        help="SQLite journal mode (default: WAL, or DELETE for a database on a network drive)")
+    commands = parser.add_subparsers(dest="command")
+
+    import_bills = commands.add_parser("import-bills", help="move a bill_history.csv into the database")
+    import_bills.add_argument("path", nargs="?", default=bill_history_path)
+    import_bills.add_argument("--batch-rows", type=int, default=100000)
+
+    import_stock = commands.add_parser("import-stock", help="merge a stock CSV (Product Name,Price,Quantity) into inventory")
+    import_stock.add_argument("path")
+    import_stock.add_argument("--chunk-rows", type=int, default=50000)
+
+    bill = commands.add_parser("bill", help="check out every order in a JSON or CSV orders file")
+    bill.add_argument("orders")
+    bill.add_argument("--batch-size", type=int, default=200, help="bills per transaction")
+    bill.add_argument("--pdf-dir", default="bills", help="where bill PDFs are written")
+    bill.add_argument("--no-pdf", action="store_true", help="only record the bills")
+    bill.add_argument("--workers", type=int, default=None, help="PDF rendering processes")
+
+    export = commands.add_parser("export", help="write inventory and sales to CSV, JSONL or columnar files")
+    export.add_argument("--format", choices=list(EXPORT_FORMATS), default="csv")
+    export.add_argument("--dir", default="exports", help="folder the files are written to")
+    export.add_argument("--datasets", nargs="+", choices=list(EXPORT_DATASETS), help="default: all")
+    export.add_argument("--changes", action="store_true", help="only rows changed since the last --changes export")
+    export.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+
+    serve_command = commands.add_parser("serve", help="run the inventory server for thin-client terminals")
+    serve_command.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the LAN)")
+    serve_command.add_argument("--port", type=int, default=8765)
+
+    args = parser.parse_args(argv)
+    if args.journal_mode:
+        db.journal_mode = args.journal_mode
+    if args.command == "import-bills":
+        rows = import_bill_history(db.connection(), args.path, batch_rows=args.batch_rows)
+        print(f"Imported {rows} bill lines from {args.path}")
+        return
+    if args.command == "import-stock":
+        result = import_stock_csv(db.connection(), args.path, chunk_rows=args.chunk_rows)
+        print(describe_stock_import(result, limit=MAX_IMPORT_ERRORS))
+        return 1 if result["errors"] else 0
+    if args.command == "bill":
+        pdf_dir = None if args.no_pdf else args.pdf_dir
+        try:
+            billed, failed = run_batch_billing(db.connection(), args.orders, batch_size=args.batch_size,
+                                               pdf_dir=pdf_dir, workers=args.workers)
+        except (OSError, ValueError, csv.Error, sqlite3.DatabaseError) as e:
+            print(f"Cannot bill {args.orders}: {e}", file=sys.stderr)
+            return 2
+        return 1 if failed else 0
+    if args.command == "export":
+        written = export_data(db.connection(), args.dir, args.format, args.datasets, args.changes,
+                              chunk_rows=args.chunk_rows)
+        print(describe_export(written))
+        return
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.token)
+        return
+
+    if args.server:
+        global backend
+        if not args.token:
+            parser.error("--server needs the server's --token (or INVENTORY_SERVER_TOKEN)")
+        backend = RemoteBackend(args.server, args.token)
+    app = InventoryApp(startup_report=args.startup_report)
+    app.mainloop()
 
-        # Items
-        y = height - 100
-        for item in items:
-            line = f"{item[1]} x {item[0]} @ Rs. {item[2]:.2f} = Rs. {item[3]:.2f}"
-            lw = c.stringWidth(line, "Helvetica", 12)
-            c.drawString((width - lw) / 2, y, line)
-            y -= 20
-
-        # Totals
-        for i, line in enumerate([
-            f"Total Price: Rs. {total_price:.2f}",
-            f"GST (15%): Rs. {gst:.2f}",
-            f"Final Price: Rs. {final_price:.2f}"
-        ]):
-            lw = c.stringWidth(line, "Helvetica", 12)
-            c.drawString((width - lw) / 2, y - (i * 20), line)
-
-        c.save()
 
 if __name__ == "__main__":
-    app = InventoryApp()
-    app.mainloop()
+    multiprocessing.freeze_support()  # PDF worker processes in the frozen exe
+    sys.exit(main())
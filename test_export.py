@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+
+import main
+
+
+class IncrementalExportTest(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.conn = main.Database(os.path.join(folder.name, "test.db")).connect()
+        self.addCleanup(self.conn.close)
+        self.out = os.path.join(folder.name, "exports")
+        self.backend = main.LocalBackend(self.conn)
+        for number in range(5):
+            self.backend.add_stock(f"Item {number}", 10, 1.0 + number)
+        self.backend.checkout("a", [(1, 2)], "2024-01-01 10:00:00")
+
+    def export(self, fmt="jsonl", changes=True):
+        # {dataset: (rows, incremental, fell_back)}
+        written = main.export_data(self.conn, self.out, fmt, changes=changes)
+        exported = {}
+        for dataset, path, count, incremental, fell_back in written:
+            if fmt == "jsonl":
+                with open(path, encoding="utf-8") as file:
+                    rows = [tuple(json.loads(line).values()) for line in file]
+                self.assertEqual(len(rows), count)
+            else:
+                rows = count
+            exported[dataset] = (rows, incremental, fell_back)
+        return exported
+
+    def test_first_export_has_everything(self):
+        exported = self.export()
+        rows, incremental, fell_back = exported["inventory"]
+        self.assertFalse(incremental)
+        self.assertFalse(fell_back)
+        self.assertEqual([row[0] for row in rows], [1, 2, 3, 4, 5])
+        self.assertEqual(len(exported["bills"][0]), 1)
+        self.assertEqual(len(exported["bill_items"][0]), 1)
+
+    def test_nothing_changed(self):
+        self.export()
+        exported = self.export()
+        for dataset in main.EXPORT_DATASETS:
+            self.assertEqual(exported[dataset][0], [], dataset)
+            self.assertTrue(exported[dataset][1], dataset)
+
+    def test_only_changes_and_tombstones(self):
+        self.export()
+        self.backend.checkout("b", [(2, 1), (3, 1)], "2024-01-02 10:00:00")
+        self.backend.delete_stock(4)
+        self.backend.add_stock("Item 9", 1, 9.0)
+        exported = self.export()
+        rows, incremental, _ = exported["inventory"]
+        self.assertTrue(incremental)
+        self.assertEqual(rows, [(2, "Item 1", 9, 2.0, 0), (3, "Item 2", 9, 3.0, 0),
+                                (4, None, None, None, 1), (6, "Item 9", 1, 9.0, 0)])
+        self.assertEqual([row[2] for row in exported["bills"][0]], ["b"])
+        self.assertEqual([row[1] for row in exported["bill_items"][0]], [2, 2])
+
+    def test_watermark_is_kept_per_format(self):
+        self.export("jsonl")
+        self.backend.checkout("b", [(2, 1)], "2024-01-02 10:00:00")
+        self.assertEqual(self.export("csv")["bills"][:2], (2, False))
+        self.assertEqual(len(self.export("jsonl")["bills"][0]), 1)
+
+    def test_full_export_leaves_the_watermark(self):
+        self.export()
+        self.backend.checkout("b", [(2, 1)], "2024-01-02 10:00:00")
+        self.export(changes=False)
+        self.assertEqual(len(self.export()["bills"][0]), 1)
+
+    def test_trimmed_change_log_falls_back_to_everything(self):
+        self.export()
+        self.conn.executemany("UPDATE inventory SET quantity = quantity + 1 WHERE id = 1", [()] * 20000)
+        self.conn.commit()
+        written = main.export_data(self.conn, self.out, "jsonl", ["inventory"], changes=True)
+        (_, _, rows, incremental, fell_back), = written
+        self.assertEqual((rows, incremental, fell_back), (5, False, True))
+        self.assertIn("full export", main.describe_export(written))
+        # The watermark moved on, so the next export is incremental again
+        self.assertEqual(self.export()["inventory"][:2], ([], True))
+
+
+if __name__ == "__main__":
+    unittest.main()
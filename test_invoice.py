@@ -0,0 +1,30 @@
+import unittest
+
+import main
+
+
+class PaginateTest(unittest.TestCase):
+    # Items per page are 31, or 27 on the last page, which also holds the totals
+    def page_sizes(self, count):
+        renderer = main.InvoiceRenderer(None)
+        return [len(page) for page in renderer.paginate(list(range(count)))]
+
+    def test_single_page(self):
+        for count in (0, 1, 27):
+            self.assertEqual(self.page_sizes(count), [count])
+
+    def test_totals_never_alone_on_a_page(self):
+        for count, sizes in ((28, [1, 27]), (31, [4, 27]), (58, [31, 27]), (59, [31, 1, 27]), (62, [31, 4, 27])):
+            self.assertEqual(self.page_sizes(count), sizes)
+
+    def test_every_page_has_items(self):
+        for count in range(1, 200):
+            sizes = self.page_sizes(count)
+            self.assertEqual(sum(sizes), count)
+            self.assertTrue(all(sizes))
+            self.assertTrue(all(size <= 31 for size in sizes))
+            self.assertLessEqual(sizes[-1], 27)
+
+
+if __name__ == "__main__":
+    unittest.main()
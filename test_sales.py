@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import main
+
+
+class SalesSummaryTest(unittest.TestCase):
+    # sales_summary reads whole months from sales_monthly and the days at either
+    # end from sales_daily; it must agree with adding up the bills themselves
+    DATES = ["2023-12-31 23:59:59", "2024-01-01 00:00:00", "2024-01-15 12:00:00", "2024-01-31 18:00:00",
+             "2024-02-01 09:00:00", "2024-02-29 10:00:00", "2024-03-01 08:00:00", "2024-03-31 20:00:00",
+             "2024-04-01 07:00:00", "2024-04-30 12:00:00"]
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.conn = main.Database(os.path.join(folder.name, "test.db")).connect()
+        self.addCleanup(self.conn.close)
+        cur = self.conn.cursor()
+        for number, bill_date in enumerate(self.DATES, start=1):
+            # (name, qty, price, line total, inventory id, cost)
+            items = [("Tea", number, 2.0, number * 2.0, None, number * 1.5)]
+            total = number * 2.0
+            main.record_bill(cur, bill_date, f"Customer {number}", items, total, total * main.GST_RATE,
+                             total * (1 + main.GST_RATE))
+        self.conn.commit()
+
+    def expected(self, start, end):
+        # The same figures straight from bills and bill_items
+        bills = [(number, bill_date[:10]) for number, bill_date in enumerate(self.DATES, start=1)
+                 if (start is None or bill_date[:10] >= start) and (end is None or bill_date[:10] <= end)]
+        numbers = [number for number, _ in bills]
+        return (len(bills), sum(number * 2.0 * (1 + main.GST_RATE) for number in numbers),
+                sum(number * 2.0 * main.GST_RATE for number in numbers), sum(number * 1.5 for number in numbers))
+
+    def assertSummary(self, start, end):
+        summary = main.sales_summary(self.conn, start, end)
+        expected = self.expected(start, end)
+        self.assertEqual(summary[0], expected[0], (start, end))
+        for value, wanted in zip(summary[1:], expected[1:]):
+            self.assertAlmostEqual(value, wanted, msg=(start, end))
+
+    def test_open_ended(self):
+        self.assertSummary(None, None)
+        self.assertSummary("2024-01-15", None)
+        self.assertSummary(None, "2024-02-29")
+
+    def test_whole_months(self):
+        self.assertSummary("2024-01-01", "2024-03-31")
+        self.assertSummary("2024-02-01", "2024-02-29")
+
+    def test_partial_months_at_either_end(self):
+        self.assertSummary("2023-12-31", "2024-04-01")
+        self.assertSummary("2024-01-15", "2024-03-01")
+        self.assertSummary("2024-01-31", "2024-02-01")
+
+    def test_within_one_month(self):
+        self.assertSummary("2024-01-02", "2024-01-30")
+        self.assertSummary("2024-01-31", "2024-01-31")
+        self.assertSummary("2024-03-01", "2024-03-01")
+
+    def test_every_range_of_edge_days(self):
+        days = sorted({bill_date[:10] for bill_date in self.DATES} | {"2024-01-02", "2024-02-28", "2024-05-01"})
+        for start in days:
+            for end in days:
+                if start <= end:
+                    self.assertSummary(start, end)
+
+    def test_empty_range(self):
+        self.assertEqual(main.sales_summary(self.conn, "2024-05-01", "2024-05-31"), (0, 0.0, 0.0, 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
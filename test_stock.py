@@ -0,0 +1,146 @@
+import os
+import random
+import sqlite3
+import tempfile
+import unittest
+
+import main
+
+
+class DatabaseTestCase(unittest.TestCase):
+    # Each test gets a fresh database file in a temporary folder
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, "test.db")
+
+    def connect(self):
+        conn = main.Database(self.path).connect()
+        self.addCleanup(conn.close)
+        return conn
+
+
+class FifoCostTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = self.connect()
+        self.backend = main.LocalBackend(self.conn)
+
+    def lots(self, item_id):
+        return self.conn.execute("SELECT unit_cost, qty_remaining FROM stock_lots WHERE inventory_id = ? ORDER BY id",
+                                 (item_id,)).fetchall()
+
+    def test_oldest_lots_are_sold_first(self):
+        self.backend.add_stock("Milk", 5, 2.0, 1.0)
+        self.backend.add_stock("Milk", 5, 2.0, 1.5)
+        bill_id, items, *_ = self.backend.checkout("a", [(1, 7)])
+        self.assertEqual(items[0][5], 5 * 1.0 + 2 * 1.5)
+        self.assertEqual(self.lots(1), [(1.0, 0), (1.5, 3)])
+        cost = self.conn.execute("SELECT cost FROM bill_items WHERE bill_id = ?", (bill_id,)).fetchone()[0]
+        self.assertEqual(cost, 8.0)
+
+    def test_cost_defaults_to_the_price(self):
+        self.backend.add_stock("Tea", 4, 3.0)
+        _, items, *_ = self.backend.checkout("a", [(1, 2)])
+        self.assertEqual(items[0][5], 6.0)
+
+    def test_stock_without_lots_is_costed_at_the_fallback(self):
+        self.backend.add_stock("Jam", 2, 4.0, 1.0)
+        # Quantity edited outside the app: no lot covers the extra units
+        self.conn.execute("UPDATE inventory SET quantity = 5 WHERE id = 1")
+        self.conn.commit()
+        cur = self.conn.cursor()
+        cur.execute("BEGIN")
+        self.assertEqual(main.consume_lots(cur, 1, 5, 4.0), 2 * 1.0 + 3 * 4.0)
+        self.conn.commit()
+        self.assertEqual(self.lots(1), [(1.0, 0)])
+
+    def test_out_of_stock_leaves_the_lots_alone(self):
+        self.backend.add_stock("Soap", 3, 1.0, 0.5)
+        with self.assertRaises(main.OutOfStockError):
+            self.backend.checkout("a", [(1, 4)])
+        self.assertEqual(self.lots(1), [(0.5, 3)])
+
+
+class UniqueStockMigrationTest(DatabaseTestCase):
+    def test_duplicates_are_folded_into_the_oldest_row(self):
+        # A database from before migrate_unique_stock, with repeated (name, price) rows
+        conn = sqlite3.connect(self.path)
+        main.create_schema(conn)
+        cur = conn.cursor()
+        for step in main.MIGRATIONS[:3]:
+            step(cur)
+        cur.execute("PRAGMA user_version = 3")
+        cur.executemany("INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)",
+                        [("Rice", 2, 1.0), ("Tea", 1, 2.0), ("Rice", 3, 1.0), ("Rice", 4, 1.5), ("Rice", 5, 1.0)])
+        conn.commit()
+        conn.close()
+
+        conn = self.connect()
+        self.assertEqual(conn.execute("SELECT id, name, quantity, price FROM inventory ORDER BY id").fetchall(),
+                         [(1, "Rice", 10, 1.0), (2, "Tea", 1, 2.0), (4, "Rice", 4, 1.5)])
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO inventory (name, quantity, price) VALUES ('Rice', 1, 1.0)")
+        # Stock that was there before lots existed becomes one lot per row
+        self.assertEqual(conn.execute("SELECT inventory_id, qty_remaining FROM stock_lots ORDER BY id").fetchall(),
+                         [(1, 10), (2, 1), (4, 4)])
+
+
+class CatalogPagingTest(DatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.conn = self.connect()
+        rng = random.Random(7)
+        # Few distinct values, so ties on the id are common; NULL prices never clash
+        # in the unique (name, price) index, so those rows may repeat a name
+        rows = {}
+        while len(rows) < 300:
+            name, price = f"Item {rng.randint(0, 150)}", rng.choice([None, 1.0, 2.5, 3.0])
+            rows[name, price if price is not None else len(rows)] = (name, rng.choice([None, 0, 1, 2, 5, 9]), price)
+        self.conn.executemany("INSERT INTO inventory (name, quantity, price) VALUES (?, ?, ?)", list(rows.values()))
+        self.conn.commit()
+        self.catalog = main.StockCatalog()
+        self.rows = self.conn.execute("SELECT id, name, quantity, price FROM inventory").fetchall()
+
+    def ordered(self, sort, descending):
+        # What ORDER BY sort, id gives: NULLs first ascending, last descending
+        column = main.STOCK_SORT_COLUMNS[sort]
+        rows = sorted(self.rows, key=lambda row: (row[column] is not None, row[column] or 0, row[0]))
+        return rows[::-1] if descending else rows
+
+    def test_pages_follow_and_precede_any_row(self):
+        for sort in main.STOCK_SORT_COLUMNS:
+            for descending in (False, True):
+                expected = self.ordered(sort, descending)
+                self.assertEqual(self.catalog.page(self.conn, sort, descending, limit=20), expected[:20])
+                for position in (0, 1, 57, 150, len(expected) - 1):
+                    anchor = main.stock_key(expected[position], sort)
+                    self.assertEqual(self.catalog.page(self.conn, sort, descending, after=anchor, limit=20),
+                                     expected[position + 1:position + 21], (sort, descending, position))
+                    self.assertEqual(self.catalog.page(self.conn, sort, descending, before=anchor, limit=20),
+                                     expected[max(0, position - 20):position], (sort, descending, position))
+
+    def test_paging_visits_every_row_once(self):
+        for sort in main.STOCK_SORT_COLUMNS:
+            for descending in (False, True):
+                seen, anchor = [], None
+                while True:
+                    page = self.catalog.page(self.conn, sort, descending, after=anchor, limit=33)
+                    if not page:
+                        break
+                    seen += page
+                    anchor = main.stock_key(page[-1], sort)
+                self.assertEqual(seen, self.ordered(sort, descending))
+
+    def test_positional_fetch(self):
+        expected = self.ordered("price", True)
+        self.assertEqual(self.catalog.at(self.conn, "price", True, offset=40, limit=25), expected[40:65])
+        self.assertEqual(self.catalog.count(self.conn), len(expected))
+
+    def test_unknown_sort_column(self):
+        with self.assertRaises(ValueError):
+            self.catalog.page(self.conn, "password")
+
+
+if __name__ == "__main__":
+    unittest.main()